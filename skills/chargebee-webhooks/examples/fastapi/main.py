@@ -1,13 +1,48 @@
 import os
-import base64
-from typing import Optional, Dict, Any
-from fastapi import FastAPI, Header, HTTPException, Depends, Response
+import hmac
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
+import msgspec
+from fastapi import FastAPI, Header, HTTPException, Depends, Request, Response
 from dotenv import load_dotenv
 
+# Use pybase64's SIMD-accelerated decoder when it is installed; it is a
+# drop-in replacement for the standard library function
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Chargebee Webhook Handler")
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(title="Chargebee Webhook Handler", lifespan=lifespan)
+
+# Read the expected credentials once at startup instead of on every request
+expected_username = (os.getenv("CHARGEBEE_WEBHOOK_USERNAME") or "").encode()
+expected_password = (os.getenv("CHARGEBEE_WEBHOOK_PASSWORD") or "").encode()
+
+if not expected_username or not expected_password:
+    logger.error("Missing CHARGEBEE_WEBHOOK_USERNAME or CHARGEBEE_WEBHOOK_PASSWORD environment variables")
 
 
 def verify_chargebee_auth(authorization: Optional[str] = Header(None)) -> bool:
@@ -17,110 +52,157 @@ def verify_chargebee_auth(authorization: Optional[str] = Header(None)) -> bool:
     if not authorization or not authorization.startswith("Basic "):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # Decode Base64
+    # Decode Base64 (kept as bytes; no need to decode to str for comparison)
     encoded = authorization[6:]
     try:
-        decoded = base64.b64decode(encoded).decode('utf-8')
+        decoded = b64decode(encoded)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid authorization encoding")
 
-    # Split username:password (handle colons in password)
-    if ':' not in decoded:
+    # Split username:password on the first colon (passwords may contain colons)
+    username, separator, password = decoded.partition(b':')
+    if not separator:
         raise HTTPException(status_code=401, detail="Invalid authorization format")
 
-    colon_index = decoded.index(':')
-    username = decoded[:colon_index]
-    password = decoded[colon_index + 1:]
-
     # Verify credentials against environment variables
-    expected_username = os.getenv("CHARGEBEE_WEBHOOK_USERNAME")
-    expected_password = os.getenv("CHARGEBEE_WEBHOOK_PASSWORD")
-
     if not expected_username or not expected_password:
-        print("ERROR: Missing CHARGEBEE_WEBHOOK_USERNAME or CHARGEBEE_WEBHOOK_PASSWORD environment variables")
         raise HTTPException(status_code=500, detail="Server configuration error")
 
-    if username != expected_username or password != expected_password:
+    # Timing-safe comparison; bitwise & so both checks always run
+    username_ok = hmac.compare_digest(username, expected_username)
+    password_ok = hmac.compare_digest(password, expected_password)
+    if not (username_ok & password_ok):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     return True
 
 
+class ChargebeeEvent(msgspec.Struct):
+    """The event fields this handler reads; other keys are skipped on decode."""
+    id: Optional[str] = None
+    event_type: Optional[str] = None
+    occurred_at: Optional[int] = None
+    content: Dict[str, Any] = {}
+
+
+# Shared read-only fallback for missing keys, so lookups don't allocate
+EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def get_content_object(event: ChargebeeEvent, object_type: str) -> Mapping[str, Any]:
+    """Return event.content[object_type], or an empty mapping if missing."""
+    return event.content.get(object_type) or EMPTY
+
+
+def handle_subscription_created(event: ChargebeeEvent) -> None:
+    subscription = get_content_object(event, "subscription")
+    logger.info("New subscription created: %s", subscription.get('id'))
+    # TODO: Provision user access, send welcome email, etc.
+
+
+def handle_subscription_changed(event: ChargebeeEvent) -> None:
+    subscription = get_content_object(event, "subscription")
+    logger.info("Subscription updated: %s", subscription.get('id'))
+    # TODO: Update user permissions, sync subscription data
+
+
+def handle_subscription_cancelled(event: ChargebeeEvent) -> None:
+    subscription = get_content_object(event, "subscription")
+    logger.info("Subscription cancelled: %s", subscription.get('id'))
+    # TODO: Schedule access revocation, trigger retention flow
+
+
+def handle_subscription_reactivated(event: ChargebeeEvent) -> None:
+    subscription = get_content_object(event, "subscription")
+    logger.info("Subscription reactivated: %s", subscription.get('id'))
+    # TODO: Restore user access
+
+
+def handle_payment_succeeded(event: ChargebeeEvent) -> None:
+    transaction = get_content_object(event, "transaction")
+    logger.info("Payment succeeded: %s", transaction.get('id'))
+    # TODO: Update payment status, send receipt
+
+
+def handle_payment_failed(event: ChargebeeEvent) -> None:
+    transaction = get_content_object(event, "transaction")
+    logger.info("Payment failed: %s", transaction.get('id'))
+    # TODO: Send payment failure notification, retry logic
+
+
+def handle_invoice_generated(event: ChargebeeEvent) -> None:
+    invoice = get_content_object(event, "invoice")
+    logger.info("Invoice generated: %s", invoice.get('id'))
+    # TODO: Send invoice to customer
+
+
+def handle_customer_created(event: ChargebeeEvent) -> None:
+    customer = get_content_object(event, "customer")
+    logger.info("Customer created: %s", customer.get('id'))
+    # TODO: Create user account, sync customer data
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "subscription_created": handle_subscription_created,
+    "subscription_changed": handle_subscription_changed,
+    "subscription_cancelled": handle_subscription_cancelled,
+    "subscription_reactivated": handle_subscription_reactivated,
+    "payment_succeeded": handle_payment_succeeded,
+    "payment_failed": handle_payment_failed,
+    "invoice_generated": handle_invoice_generated,
+    "customer_created": handle_customer_created,
+}
+
+
+# Constant responses are serialized once at import instead of on every call
+OK_RESPONSE = Response(content=b'{"status":"OK"}', media_type="application/json")
+HEALTHY_RESPONSE = Response(content=b'{"status":"healthy"}', media_type="application/json")
+ROOT_RESPONSE = Response(
+    content=msgspec.json.encode({
+        "service": "Chargebee Webhook Handler",
+        "webhook_endpoint": "/webhooks/chargebee",
+        "docs": "/docs"
+    }),
+    media_type="application/json"
+)
+
+
 @app.post("/webhooks/chargebee")
 async def handle_chargebee_webhook(
-    event: Dict[str, Any],
+    request: Request,
     auth_valid: bool = Depends(verify_chargebee_auth)
 ):
     """
     Handle Chargebee webhook events
     """
-    # Extract event details
-    event_id = event.get("id")
-    event_type = event.get("event_type")
-    occurred_at = event.get("occurred_at")
+    # Decode only the fields the handler reads, straight from the raw body
+    try:
+        event = msgspec.json.decode(await request.body(), type=ChargebeeEvent)
+    except msgspec.DecodeError:
+        raise HTTPException(status_code=422, detail="Invalid JSON payload")
 
     # Log event details
-    print(f"Received Chargebee webhook: id={event_id}, type={event_type}, occurred_at={occurred_at}")
-
-    # Handle specific event types
-    if event_type == "subscription_created":
-        subscription = event.get("content", {}).get("subscription", {})
-        print(f"New subscription created: {subscription.get('id')}")
-        # TODO: Provision user access, send welcome email, etc.
-
-    elif event_type == "subscription_changed":
-        subscription = event.get("content", {}).get("subscription", {})
-        print(f"Subscription updated: {subscription.get('id')}")
-        # TODO: Update user permissions, sync subscription data
-
-    elif event_type == "subscription_cancelled":
-        subscription = event.get("content", {}).get("subscription", {})
-        print(f"Subscription cancelled: {subscription.get('id')}")
-        # TODO: Schedule access revocation, trigger retention flow
-
-    elif event_type == "subscription_reactivated":
-        subscription = event.get("content", {}).get("subscription", {})
-        print(f"Subscription reactivated: {subscription.get('id')}")
-        # TODO: Restore user access
-
-    elif event_type == "payment_succeeded":
-        transaction = event.get("content", {}).get("transaction", {})
-        print(f"Payment succeeded: {transaction.get('id')}")
-        # TODO: Update payment status, send receipt
-
-    elif event_type == "payment_failed":
-        transaction = event.get("content", {}).get("transaction", {})
-        print(f"Payment failed: {transaction.get('id')}")
-        # TODO: Send payment failure notification, retry logic
-
-    elif event_type == "invoice_generated":
-        invoice = event.get("content", {}).get("invoice", {})
-        print(f"Invoice generated: {invoice.get('id')}")
-        # TODO: Send invoice to customer
-
-    elif event_type == "customer_created":
-        customer = event.get("content", {}).get("customer", {})
-        print(f"Customer created: {customer.get('id')}")
-        # TODO: Create user account, sync customer data
+    logger.info("Received Chargebee webhook: id=%s, type=%s, occurred_at=%s", event.id, event.event_type, event.occurred_at)
 
+    # Dispatch to the handler for this event type
+    handler = EVENT_HANDLERS.get(event.event_type)
+    if handler:
+        handler(event)
     else:
-        print(f"Unhandled event type: {event_type}")
+        logger.info("Unhandled event type: %s", event.event_type)
 
     # Always return 200 to acknowledge receipt
-    return {"status": "OK"}
+    return OK_RESPONSE
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return HEALTHY_RESPONSE
 
 
 @app.get("/")
 async def root():
     """Root endpoint with basic info"""
-    return {
-        "service": "Chargebee Webhook Handler",
-        "webhook_endpoint": "/webhooks/chargebee",
-        "docs": "/docs"
-    }
\ No newline at end of file
+    return ROOT_RESPONSE
\ No newline at end of file
@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 os.environ["CHARGEBEE_WEBHOOK_USERNAME"] = "test_webhook_user"
 os.environ["CHARGEBEE_WEBHOOK_PASSWORD"] = "test_webhook_pass"
 
+import main
 from main import app
 
 client = TestClient(app)
@@ -106,11 +107,10 @@ class TestChargebeeWebhook:
         )
         assert response.status_code == 401
 
-    def test_webhook_with_password_containing_colons(self):
+    def test_webhook_with_password_containing_colons(self, monkeypatch):
         """Test webhook with password containing colons"""
-        # Temporarily change the expected password
-        original_password = os.environ["CHARGEBEE_WEBHOOK_PASSWORD"]
-        os.environ["CHARGEBEE_WEBHOOK_PASSWORD"] = "pass:with:colons"
+        # Credentials are read at startup, so patch the loaded value
+        monkeypatch.setattr(main, "expected_password", b"pass:with:colons")
 
         response = client.post(
             "/webhooks/chargebee",
@@ -122,9 +122,6 @@ class TestChargebeeWebhook:
         assert response.status_code == 200
         assert response.json() == {"status": "OK"}
 
-        # Restore original password
-        os.environ["CHARGEBEE_WEBHOOK_PASSWORD"] = original_password
-
     def test_different_event_types(self):
         """Test handling of different event types"""
         event_types = [
@@ -185,6 +182,17 @@ class TestChargebeeWebhook:
         )
         assert response.status_code == 422
 
+    def test_webhook_with_non_object_json(self):
+        """Test webhook with a JSON body that is not an object"""
+        response = client.post(
+            "/webhooks/chargebee",
+            json=["not", "an", "event"],
+            headers={
+                "Authorization": create_basic_auth_header("test_webhook_user", "test_webhook_pass")
+            }
+        )
+        assert response.status_code == 422
+
     def test_health_endpoint(self):
         """Test health check endpoint"""
         response = client.get("/health")
@@ -4,67 +4,187 @@
 import os
 import hmac
 import hashlib
-import base64
-import json
-from time import time
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from time import time_ns
 from typing import Dict, Any
 
-from fastapi import FastAPI, Request, HTTPException, Header
-from fastapi.responses import JSONResponse
+import msgspec
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import Response
 from dotenv import load_dotenv
 
+# Use pybase64's SIMD-accelerated decoder when it is installed; it is a
+# drop-in replacement for the standard library function
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Clerk Webhook Handler")
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(title="Clerk Webhook Handler", lifespan=lifespan)
+
+# Read the webhook secret once at startup instead of on every request
+webhook_secret = os.environ.get("CLERK_WEBHOOK_SECRET")
+
+# Decode the signing key once (the secret is "whsec_" followed by base64)
+signing_key = None
+if webhook_secret and webhook_secret.startswith("whsec_"):
+    try:
+        signing_key = b64decode(webhook_secret.split('_', 1)[1])
+    except ValueError:
+        pass
+
+if signing_key is None:
+    logger.error("Invalid webhook secret configuration: CLERK_WEBHOOK_SECRET must be 'whsec_' followed by base64")
+
+
+def iter_svix_signatures(svix_signature: bytes):
+    """
+    Yield decoded signatures from the svix-signature header.
+
+    Svix can send multiple signatures separated by spaces, each in the
+    format "v1,actualSignature". Malformed entries are skipped.
+    """
+    start = 0
+    while start < len(svix_signature):
+        end = svix_signature.find(b' ', start)
+        if end == -1:
+            end = len(svix_signature)
+        _, _, signature = svix_signature[start:end].partition(b',')
+        try:
+            yield b64decode(signature)
+        except ValueError:
+            pass
+        start = end + 1
 
 
 def verify_clerk_signature(
     body: bytes,
-    svix_id: str,
-    svix_timestamp: str,
-    svix_signature: str,
-    secret: str
+    svix_id: bytes,
+    svix_timestamp: bytes,
+    svix_signature: bytes,
+    key: bytes
 ) -> bool:
     """Verify Clerk webhook signature using Svix headers."""
     try:
-        # Construct the signed content
-        signed_content = f"{svix_id}.{svix_timestamp}.{body.decode()}"
+        # Calculate expected signature over "{svix_id}.{svix_timestamp}.{body}".
+        # Feed the pieces to the HMAC in turn rather than concatenating them,
+        # so the body is never copied.
+        mac = hmac.new(key, svix_id, hashlib.sha256)
+        mac.update(b".")
+        mac.update(svix_timestamp)
+        mac.update(b".")
+        mac.update(body)
+        expected_signature = mac.digest()
+
+        # Check if any signature matches (timing-safe), stopping at the first
+        for signature in iter_svix_signatures(svix_signature):
+            if hmac.compare_digest(signature, expected_signature):
+                return True
 
-        # Extract the base64 secret (everything after 'whsec_')
-        secret_bytes = base64.b64decode(secret.split('_')[1])
+        return False
+
+    except Exception:
+        return False
 
-        # Calculate expected signature
-        expected_signature = base64.b64encode(
-            hmac.new(secret_bytes, signed_content.encode(), hashlib.sha256).digest()
-        ).decode()
 
-        # Svix can send multiple signatures separated by spaces
-        # Each signature is in format "v1,actualSignature"
-        signatures = [sig.split(',')[1] for sig in svix_signature.split(' ')]
+class ClerkEvent(msgspec.Struct):
+    """Top-level envelope of a Clerk webhook; only type and data are decoded."""
+    type: str = "unknown"
+    data: Dict[str, Any] = {}
 
-        # Check if any signature matches
-        return expected_signature in signatures
 
-    except Exception:
-        return False
+def handle_user_created(data: Dict[str, Any]) -> None:
+    logger.info("New user created: %s", data.get('id'))
+    email = None
+    if email_addresses := data.get("email_addresses"):
+        email = email_addresses[0].get("email_address") if email_addresses else None
+    logger.info("Email: %s", email)
+    # TODO: Add your user creation logic here
+
+
+def handle_user_updated(data: Dict[str, Any]) -> None:
+    logger.info("User updated: %s", data.get('id'))
+    # TODO: Add your user update logic here
+
+
+def handle_user_deleted(data: Dict[str, Any]) -> None:
+    logger.info("User deleted: %s", data.get('id'))
+    # TODO: Add your user deletion logic here
+
+
+def handle_session_created(data: Dict[str, Any]) -> None:
+    logger.info("Session created: %s", data.get('id'))
+    logger.info("User ID: %s", data.get('user_id'))
+    # TODO: Add your session creation logic here
+
+
+def handle_session_ended(data: Dict[str, Any]) -> None:
+    logger.info("Session ended: %s", data.get('id'))
+    logger.info("User ID: %s", data.get('user_id'))
+    # TODO: Add your session end logic here
+
+
+def handle_organization_created(data: Dict[str, Any]) -> None:
+    logger.info("Organization created: %s", data.get('id'))
+    logger.info("Name: %s", data.get('name'))
+    # TODO: Add your organization creation logic here
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "user.created": handle_user_created,
+    "user.updated": handle_user_updated,
+    "user.deleted": handle_user_deleted,
+    "session.created": handle_session_created,
+    "session.ended": handle_session_ended,
+    "organization.created": handle_organization_created,
+}
+
+# The health body never changes, so serialize it once at import
+HEALTH_RESPONSE = Response(content=b'{"status":"ok"}', media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok"}
+    return HEALTH_RESPONSE
 
 
 @app.post("/webhooks/clerk")
-async def clerk_webhook(
-    request: Request,
-    svix_id: str = Header(None),
-    svix_timestamp: str = Header(None),
-    svix_signature: str = Header(None)
-):
+async def clerk_webhook(request: Request):
     """Handle Clerk webhooks with signature verification."""
 
+    # Read the Svix headers as raw bytes; they are only used to build the
+    # signed content, so there is no need to decode them to str
+    svix_headers = {
+        name: value for name, value in request.headers.raw
+        if name.startswith(b"svix-")
+    }
+    svix_id = svix_headers.get(b"svix-id")
+    svix_timestamp = svix_headers.get(b"svix-timestamp")
+    svix_signature = svix_headers.get(b"svix-signature")
+
     # Verify required headers are present
     if not all([svix_id, svix_timestamp, svix_signature]):
         raise HTTPException(
@@ -72,94 +192,64 @@ async def clerk_webhook(
             detail="Missing required Svix headers"
         )
 
+    # Check timestamp to prevent replay attacks (5 minute window).
+    # This is cheap, so do it before reading and hashing the body.
+    if not svix_timestamp.isdigit():
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid timestamp"
+        )
+
+    timestamp = int(svix_timestamp)
+    current_time = time_ns() // 1_000_000_000
+    if current_time - timestamp > 300:  # 5 minutes
+        raise HTTPException(
+            status_code=400,
+            detail="Timestamp too old"
+        )
+
     # Get raw body
     body = await request.body()
 
-    # Get webhook secret
-    secret = os.environ.get("CLERK_WEBHOOK_SECRET")
-    if not secret or not secret.startswith("whsec_"):
-        print("Invalid webhook secret configuration")
+    # Check webhook secret configuration
+    if signing_key is None:
         raise HTTPException(
             status_code=500,
             detail="Server configuration error"
         )
 
     # Verify signature
-    if not verify_clerk_signature(body, svix_id, svix_timestamp, svix_signature, secret):
+    if not verify_clerk_signature(body, svix_id, svix_timestamp, svix_signature, signing_key):
         raise HTTPException(
             status_code=400,
             detail="Invalid signature"
         )
 
-    # Check timestamp to prevent replay attacks (5 minute window)
-    try:
-        timestamp = int(svix_timestamp)
-        current_time = int(time())
-        if current_time - timestamp > 300:  # 5 minutes
-            raise HTTPException(
-                status_code=400,
-                detail="Timestamp too old"
-            )
-    except ValueError:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid timestamp"
-        )
-
     # Parse the verified event
     try:
-        event = json.loads(body)
-    except json.JSONDecodeError:
+        event = msgspec.json.decode(body, type=ClerkEvent)
+    except msgspec.DecodeError:
         raise HTTPException(
             status_code=400,
             detail="Invalid JSON payload"
         )
 
     # Handle different event types
-    event_type = event.get("type", "unknown")
-    event_data = event.get("data", {})
-
-    print(f"Received Clerk webhook: {event_type}")
-
-    # Process based on event type
-    if event_type == "user.created":
-        print(f"New user created: {event_data.get('id')}")
-        email = None
-        if email_addresses := event_data.get("email_addresses"):
-            email = email_addresses[0].get("email_address") if email_addresses else None
-        print(f"Email: {email}")
-        # TODO: Add your user creation logic here
-
-    elif event_type == "user.updated":
-        print(f"User updated: {event_data.get('id')}")
-        # TODO: Add your user update logic here
-
-    elif event_type == "user.deleted":
-        print(f"User deleted: {event_data.get('id')}")
-        # TODO: Add your user deletion logic here
-
-    elif event_type == "session.created":
-        print(f"Session created: {event_data.get('id')}")
-        print(f"User ID: {event_data.get('user_id')}")
-        # TODO: Add your session creation logic here
-
-    elif event_type == "session.ended":
-        print(f"Session ended: {event_data.get('id')}")
-        print(f"User ID: {event_data.get('user_id')}")
-        # TODO: Add your session end logic here
-
-    elif event_type == "organization.created":
-        print(f"Organization created: {event_data.get('id')}")
-        print(f"Name: {event_data.get('name')}")
-        # TODO: Add your organization creation logic here
+    event_type = event.type
+
+    logger.info("Received Clerk webhook: %s", event_type)
 
+    # Dispatch to the handler for this event type
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler:
+        handler(event.data)
     else:
-        print(f"Unhandled event type: {event_type}")
+        logger.info("Unhandled event type: %s", event_type)
 
     # Return success response
-    return JSONResponse(
-        content={"success": True, "type": event_type},
-        status_code=200
+    return Response(
+        content=msgspec.json.encode({"success": True, "type": event_type}),
+        media_type="application/json"
     )
 
 
@@ -5,12 +5,14 @@ import hashlib
 import base64
 import time
 from fastapi.testclient import TestClient
-from main import app
 import os
 import secrets
 
-# Test webhook secret
+# Test webhook secret (set before importing the app, which reads it at startup)
 TEST_SECRET = "whsec_dGVzdF9zZWNyZXRfa2V5X2Zvci13ZWJob29rcw=="
+os.environ["CLERK_WEBHOOK_SECRET"] = TEST_SECRET
+
+from main import app
 
 # Test client
 client = TestClient(app)
@@ -26,12 +28,6 @@ def generate_clerk_signature(payload: str, secret: str, timestamp: str, msg_id:
     return f"v1,{signature}"
 
 
-@pytest.fixture(autouse=True)
-def setup_env(monkeypatch):
-    """Set test environment variables."""
-    monkeypatch.setenv("CLERK_WEBHOOK_SECRET", TEST_SECRET)
-
-
 def test_health_check():
     """Test health check endpoint."""
     response = client.get("/health")
@@ -107,6 +103,27 @@ def test_multiple_signatures():
     assert response.status_code == 200
 
 
+def test_malformed_signature_before_valid_one():
+    """Test a malformed signature entry does not hide a valid one."""
+    payload_str = json.dumps({"data": {"id": "user_123"}, "type": "user.updated"})
+    timestamp = str(int(time.time()))
+    msg_id = "msg_" + secrets.token_hex(16)
+    valid_signature = generate_clerk_signature(payload_str, TEST_SECRET, timestamp, msg_id)
+
+    response = client.post(
+        "/webhooks/clerk",
+        content=payload_str,
+        headers={
+            "content-type": "application/json",
+            "svix-id": msg_id,
+            "svix-timestamp": timestamp,
+            "svix-signature": f"v1,!!!notbase64 {valid_signature}"
+        }
+    )
+
+    assert response.status_code == 200
+
+
 def test_missing_headers():
     """Test rejection when headers are missing."""
     payload = {"data": {"id": "user_123"}, "type": "user.created"}
@@ -177,6 +194,43 @@ def test_old_timestamp():
     assert response.json()["detail"] == "Timestamp too old"
 
 
+def test_old_timestamp_rejected_before_signature_check():
+    """Test stale timestamps are rejected without verifying the signature."""
+    payload_str = json.dumps({"data": {"id": "user_123"}, "type": "user.created"})
+    old_timestamp = str(int(time.time()) - 600)
+
+    response = client.post(
+        "/webhooks/clerk",
+        content=payload_str,
+        headers={
+            "content-type": "application/json",
+            "svix-id": "msg_" + secrets.token_hex(16),
+            "svix-timestamp": old_timestamp,
+            "svix-signature": "v1,aW52YWxpZF9zaWduYXR1cmU="
+        }
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Timestamp too old"
+
+
+def test_invalid_timestamp():
+    """Test rejection of non-numeric timestamps."""
+    response = client.post(
+        "/webhooks/clerk",
+        content=json.dumps({"data": {"id": "user_123"}, "type": "user.created"}),
+        headers={
+            "content-type": "application/json",
+            "svix-id": "msg_" + secrets.token_hex(16),
+            "svix-timestamp": "not-a-timestamp",
+            "svix-signature": "v1,aW52YWxpZF9zaWduYXR1cmU="
+        }
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid timestamp"
+
+
 @pytest.mark.parametrize("event_type,extra_data", [
     ("user.created", {"email_addresses": [{"email_address": "test@example.com"}]}),
     ("user.updated", {}),
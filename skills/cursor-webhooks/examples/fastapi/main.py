@@ -1,117 +1,174 @@
 import os
 import hmac
 import hashlib
-import json
 from typing import Optional
-from fastapi import FastAPI, Request, HTTPException, Header
-from fastapi.responses import JSONResponse
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import msgspec
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 import logging
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
 
-def verify_cursor_webhook(body: bytes, signature_header: str, secret: str) -> bool:
+
+app = FastAPI(lifespan=lifespan)
+
+# Read the webhook secret once at startup instead of on every request
+webhook_secret = (os.getenv('CURSOR_WEBHOOK_SECRET') or '').encode()
+
+
+def verify_cursor_webhook(body: bytes, signature_header: str, secret: bytes) -> bool:
     """Verify Cursor webhook signature."""
     if not signature_header or not secret:
         return False
 
     # Cursor sends: sha256=xxxx
-    parts = signature_header.split('=')
-    if len(parts) != 2 or parts[0] != 'sha256':
+    algorithm, separator, signature = signature_header.partition('=')
+    if not separator or algorithm != 'sha256':
+        return False
+
+    # Decode the hex signature to raw bytes so we compare 32-byte digests
+    try:
+        provided = bytes.fromhex(signature)
+    except ValueError:
         return False
 
-    signature = parts[1]
     expected = hmac.new(
-        secret.encode(),
+        secret,
         body,
         hashlib.sha256
-    ).hexdigest()
+    ).digest()
 
     # Timing-safe comparison
-    return hmac.compare_digest(signature, expected)
+    return hmac.compare_digest(provided, expected)
+
+
+class AgentSource(msgspec.Struct, rename="camel"):
+    repository: Optional[str] = None
+    ref: Optional[str] = None
+
+
+class AgentTarget(msgspec.Struct, rename="camel"):
+    url: Optional[str] = None
+    branch_name: Optional[str] = None
+    pr_url: Optional[str] = None
+
+
+class CursorEvent(msgspec.Struct):
+    """The statusChange fields this handler reads; other keys are skipped on decode."""
+    id: Optional[str] = None
+    status: Optional[str] = None
+    timestamp: Optional[str] = None
+    summary: Optional[str] = None
+    source: Optional[AgentSource] = None
+    target: Optional[AgentTarget] = None
+
+
+def handle_status_change(payload: CursorEvent) -> None:
+    agent_id = payload.id
+    status = payload.status
+
+    logger.info("Agent %s status changed to: %s", agent_id, status)
+    logger.info("Timestamp: %s", payload.timestamp)
+
+    if payload.source is not None:
+        logger.info("Repository: %s", payload.source.repository)
+        logger.info("Ref: %s", payload.source.ref)
+
+    if payload.target is not None:
+        logger.info("Target URL: %s", payload.target.url)
+        logger.info("Branch: %s", payload.target.branch_name)
+        if payload.target.pr_url is not None:
+            logger.info("PR URL: %s", payload.target.pr_url)
+
+    if status == 'FINISHED':
+        logger.info("Summary: %s", payload.summary)
+        # Handle successful completion
+        # e.g., update database, notify users, trigger CI/CD
+    elif status == 'ERROR':
+        logger.error("Agent error for %s", agent_id)
+        # Handle error case
+        # e.g., send alerts, retry logic
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    'statusChange': handle_status_change,
+}
+
+
+# Constant responses are serialized once at import instead of on every call
+HEALTH_RESPONSE = Response(content=b'{"status":"ok"}', media_type="application/json")
+RECEIVED_RESPONSE = Response(content=b'{"received":true}', media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok"}
+    return HEALTH_RESPONSE
 
 
 @app.post("/webhooks/cursor")
-async def handle_cursor_webhook(
-    request: Request,
-    x_webhook_signature: Optional[str] = Header(None),
-    x_webhook_id: Optional[str] = Header(None),
-    x_webhook_event: Optional[str] = Header(None),
-    user_agent: Optional[str] = Header(None)
-):
+async def handle_cursor_webhook(request: Request):
     """Handle Cursor webhook."""
-    logger.info(f"Received webhook: {x_webhook_event} (ID: {x_webhook_id})")
+    x_webhook_signature = request.headers.get('x-webhook-signature')
+    x_webhook_id = request.headers.get('x-webhook-id')
+    x_webhook_event = request.headers.get('x-webhook-event')
+
+    logger.info("Received webhook: %s (ID: %s)", x_webhook_event, x_webhook_id)
 
     # Get raw body for signature verification
     body = await request.body()
 
     # Verify signature
-    secret = os.getenv('CURSOR_WEBHOOK_SECRET')
-    if not secret:
+    if not webhook_secret:
         logger.error("CURSOR_WEBHOOK_SECRET not configured")
         raise HTTPException(status_code=500, detail="Server configuration error")
 
-    if not verify_cursor_webhook(body, x_webhook_signature, secret):
+    if not verify_cursor_webhook(body, x_webhook_signature, webhook_secret):
         logger.error("Signature verification failed")
         raise HTTPException(status_code=401, detail="Invalid signature")
 
     # Parse the payload after verification
     try:
-        payload = json.loads(body.decode())
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse payload: {e}")
+        payload = msgspec.json.decode(body, type=CursorEvent)
+    except msgspec.DecodeError as e:
+        logger.error("Failed to parse payload: %s", e)
         raise HTTPException(status_code=400, detail="Invalid payload")
 
-    # Handle the event
-    if x_webhook_event == 'statusChange':
-        agent_id = payload.get('id')
-        status = payload.get('status')
-        timestamp = payload.get('timestamp')
-
-        logger.info(f"Agent {agent_id} status changed to: {status}")
-        logger.info(f"Timestamp: {timestamp}")
-
-        if 'source' in payload:
-            logger.info(f"Repository: {payload['source'].get('repository')}")
-            logger.info(f"Ref: {payload['source'].get('ref')}")
-
-        if 'target' in payload:
-            logger.info(f"Target URL: {payload['target'].get('url')}")
-            logger.info(f"Branch: {payload['target'].get('branchName')}")
-            if 'prUrl' in payload['target']:
-                logger.info(f"PR URL: {payload['target']['prUrl']}")
-
-        if status == 'FINISHED':
-            logger.info(f"Summary: {payload.get('summary')}")
-            # Handle successful completion
-            # e.g., update database, notify users, trigger CI/CD
-        elif status == 'ERROR':
-            logger.error(f"Agent error for {agent_id}")
-            # Handle error case
-            # e.g., send alerts, retry logic
+    # Dispatch to the handler for this event type
+    handler = EVENT_HANDLERS.get(x_webhook_event)
+    if handler:
+        handler(payload)
+    else:
+        logger.info("Unhandled event type: %s", x_webhook_event)
 
     # Always respond quickly to webhooks
-    return JSONResponse(content={"received": True})
+    return RECEIVED_RESPONSE
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle unexpected errors."""
-    logger.error(f"Webhook error: {exc}")
+    logger.error("Webhook error: %s", exc)
     return JSONResponse(
         status_code=500,
         content={"error": "Internal server error"}
@@ -124,7 +181,7 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
 
-    if not os.getenv("CURSOR_WEBHOOK_SECRET"):
+    if not webhook_secret:
         logger.warning("WARNING: CURSOR_WEBHOOK_SECRET not set. Webhooks will fail verification.")
 
     uvicorn.run(app, host=host, port=port)
\ No newline at end of file
@@ -1,13 +1,14 @@
 import os
-import json
 import hmac
 import hashlib
 import pytest
+import msgspec
 from fastapi.testclient import TestClient
 
 # Set test environment variable
 os.environ['CURSOR_WEBHOOK_SECRET'] = 'test_secret_key'
 
+import main
 from main import app
 
 client = TestClient(app)
@@ -23,32 +24,47 @@ def generate_signature(payload: bytes, secret: str) -> str:
     return f"sha256={signature}"
 
 
+VALID_PAYLOAD = {
+    "event": "statusChange",
+    "timestamp": "2024-01-01T12:00:00.000Z",
+    "id": "agent_123456",
+    "status": "FINISHED",
+    "source": {
+        "repository": "https://github.com/test/repo",
+        "ref": "main"
+    },
+    "target": {
+        "url": "https://github.com/test/repo/pull/123",
+        "branchName": "feature-branch",
+        "prUrl": "https://github.com/test/repo/pull/123"
+    },
+    "summary": "Updated 3 files and fixed linting errors"
+}
+
+# Serialized once and shared by the tests
+VALID_BODY = msgspec.json.encode(VALID_PAYLOAD)
+
+
+@pytest.fixture(scope="module")
+def signed():
+    """Request bodies and their signatures, signed once for the module."""
+    bodies = {
+        "valid": VALID_BODY,
+        "error": msgspec.json.encode({**VALID_PAYLOAD, "status": "ERROR"}),
+        "invalid_json": b'{"invalid": json}'
+    }
+    return {
+        key: (body, generate_signature(body, os.environ['CURSOR_WEBHOOK_SECRET']))
+        for key, body in bodies.items()
+    }
+
+
 class TestCursorWebhook:
     """Test Cursor webhook handler."""
 
-    def setup_method(self):
-        """Set up test data."""
-        self.valid_payload = {
-            "event": "statusChange",
-            "timestamp": "2024-01-01T12:00:00.000Z",
-            "id": "agent_123456",
-            "status": "FINISHED",
-            "source": {
-                "repository": "https://github.com/test/repo",
-                "ref": "main"
-            },
-            "target": {
-                "url": "https://github.com/test/repo/pull/123",
-                "branchName": "feature-branch",
-                "prUrl": "https://github.com/test/repo/pull/123"
-            },
-            "summary": "Updated 3 files and fixed linting errors"
-        }
-
-    def test_valid_webhook(self):
+    def test_valid_webhook(self, signed):
         """Test accepting valid webhook with correct signature."""
-        payload = json.dumps(self.valid_payload).encode()
-        signature = generate_signature(payload, os.environ['CURSOR_WEBHOOK_SECRET'])
+        payload, signature = signed["valid"]
 
         response = client.post(
             "/webhooks/cursor",
@@ -67,7 +83,7 @@ class TestCursorWebhook:
 
     def test_invalid_signature(self):
         """Test rejecting webhook with invalid signature."""
-        payload = json.dumps(self.valid_payload).encode()
+        payload = VALID_BODY
 
         response = client.post(
             "/webhooks/cursor",
@@ -85,7 +101,7 @@ class TestCursorWebhook:
 
     def test_missing_signature(self):
         """Test rejecting webhook with missing signature."""
-        payload = json.dumps(self.valid_payload).encode()
+        payload = VALID_BODY
 
         response = client.post(
             "/webhooks/cursor",
@@ -102,7 +118,7 @@ class TestCursorWebhook:
 
     def test_wrong_signature_format(self):
         """Test rejecting webhook with wrong signature format."""
-        payload = json.dumps(self.valid_payload).encode()
+        payload = VALID_BODY
 
         response = client.post(
             "/webhooks/cursor",
@@ -118,12 +134,9 @@ class TestCursorWebhook:
         assert response.status_code == 401
         assert response.json() == {"detail": "Invalid signature"}
 
-    def test_error_status(self):
+    def test_error_status(self, signed):
         """Test handling ERROR status."""
-        error_payload = self.valid_payload.copy()
-        error_payload["status"] = "ERROR"
-        payload = json.dumps(error_payload).encode()
-        signature = generate_signature(payload, os.environ['CURSOR_WEBHOOK_SECRET'])
+        payload, signature = signed["error"]
 
         response = client.post(
             "/webhooks/cursor",
@@ -139,10 +152,9 @@ class TestCursorWebhook:
         assert response.status_code == 200
         assert response.json() == {"received": True}
 
-    def test_invalid_json(self):
+    def test_invalid_json(self, signed):
         """Test rejecting invalid JSON payload."""
-        invalid_json = b'{"invalid": json}'
-        signature = generate_signature(invalid_json, os.environ['CURSOR_WEBHOOK_SECRET'])
+        invalid_json, signature = signed["invalid_json"]
 
         response = client.post(
             "/webhooks/cursor",
@@ -164,13 +176,12 @@ class TestCursorWebhook:
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
-    def test_missing_env_variable(self):
+    def test_missing_env_variable(self, monkeypatch):
         """Test handling missing environment variable."""
-        # Temporarily remove the secret
-        original_secret = os.environ.get('CURSOR_WEBHOOK_SECRET')
-        del os.environ['CURSOR_WEBHOOK_SECRET']
+        # The secret is read at startup, so patch the loaded value
+        monkeypatch.setattr(main, 'webhook_secret', b'')
 
-        payload = json.dumps(self.valid_payload).encode()
+        payload = VALID_BODY
         response = client.post(
             "/webhooks/cursor",
             content=payload,
@@ -183,8 +194,4 @@ class TestCursorWebhook:
         )
 
         assert response.status_code == 500
-        assert response.json() == {"detail": "Server configuration error"}
-
-        # Restore the secret
-        if original_secret:
-            os.environ['CURSOR_WEBHOOK_SECRET'] = original_secret
\ No newline at end of file
+        assert response.json() == {"detail": "Server configuration error"}
\ No newline at end of file
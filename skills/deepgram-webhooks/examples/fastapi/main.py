@@ -1,11 +1,11 @@
 from fastapi import FastAPI, Header, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from fastapi.responses import Response
+from typing import Optional
 import os
+import hmac
 from dotenv import load_dotenv
 import logging
-import json
+import orjson
 
 # Load environment variables
 load_dotenv()
@@ -16,39 +16,22 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Deepgram Webhook Handler")
 
-# Models for type hints
-class TranscriptionAlternative(BaseModel):
-    transcript: str
-    confidence: float
-    words: Optional[List[Dict[str, Any]]] = None
+# Read the expected token once at startup rather than on every webhook
+expected_token = (os.environ.get("DEEPGRAM_API_KEY_ID") or "").encode()
 
-class Channel(BaseModel):
-    alternatives: List[TranscriptionAlternative]
-
-class Results(BaseModel):
-    channels: List[Channel]
-
-class DeepgramWebhook(BaseModel):
-    request_id: str
-    created: str
-    duration: float
-    channels: int
-    model_info: Optional[Dict[str, Any]] = None
-    results: Results
-    metadata: Optional[Dict[str, Any]] = None
+if not expected_token:
+    logger.error("DEEPGRAM_API_KEY_ID not configured")
 
 # Dependency for webhook verification
 async def verify_deepgram_webhook(dg_token: Optional[str] = Header(None, alias="dg-token")):
     """Verify Deepgram webhook authentication"""
-    expected_token = os.environ.get("DEEPGRAM_API_KEY_ID")
-
     if not dg_token:
         raise HTTPException(status_code=401, detail="Missing dg-token header")
 
     if not expected_token:
         raise HTTPException(status_code=500, detail="DEEPGRAM_API_KEY_ID not configured")
 
-    if dg_token != expected_token:
+    if not hmac.compare_digest(dg_token.encode(), expected_token):
         raise HTTPException(status_code=403, detail="Invalid dg-token")
 
     return True
@@ -59,59 +42,63 @@ async def handle_deepgram_webhook(
     authenticated: bool = Depends(verify_deepgram_webhook)
 ):
     """Handle Deepgram webhook callbacks"""
+    # Parse the raw body directly; only a handful of fields are read, so
+    # there is no need to validate the whole nested payload into models
     try:
-        # Get raw body first (for potential future signature verification)
-        raw_body = await request.body()
-
-        # Parse the JSON body
-        webhook_data = json.loads(raw_body)
-
-        # Validate with Pydantic model
-        webhook = DeepgramWebhook(**webhook_data)
+        webhook_data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
 
+    try:
         # Extract key information
-        request_id = webhook.request_id
-        created = webhook.created
-        duration = webhook.duration
+        request_id = webhook_data["request_id"]
+        created = webhook_data["created"]
+        duration = webhook_data["duration"]
 
-        # Get the transcript from the first channel and alternative
+        # Get the transcript from the first channel and alternative. Either
+        # list can be empty (e.g. silent audio), which is still a valid result.
         transcript = ""
         confidence = 0.0
 
-        if webhook.results.channels:
-            first_channel = webhook.results.channels[0]
-            if first_channel.alternatives:
-                first_alternative = first_channel.alternatives[0]
-                transcript = first_alternative.transcript
-                confidence = first_alternative.confidence
-
-        logger.info(f"Webhook received: {request_id}")
-        logger.info(f"Created: {created}")
-        logger.info(f"Duration: {duration}s")
-        logger.info(f"Transcript preview: {transcript[:100]}...")
-        logger.info(f"Confidence: {confidence}")
-
-        # Process the transcription as needed
-        # For example: save to database, trigger notifications, etc.
-
-        # Return success to prevent retries
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "requestId": request_id
-            }
-        )
-
-    except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
+        channels = webhook_data["results"]["channels"]
+        if channels and (alternatives := channels[0]["alternatives"]):
+            transcript = alternatives[0]["transcript"]
+            confidence = alternatives[0]["confidence"]
+    except (KeyError, IndexError, TypeError):
         raise HTTPException(status_code=400, detail="Invalid webhook payload")
 
+    logger.info(
+        "Webhook received: %s created=%s duration=%ss confidence=%s transcript=%.100s...",
+        request_id, created, duration, confidence, transcript
+    )
+
+    # Process the transcription as needed
+    # For example: save to database, trigger notifications, etc.
+
+    # Return success to prevent retries
+    return Response(
+        content=orjson.dumps({"status": "success", "requestId": request_id}),
+        media_type="application/json"
+    )
+
+# The health body never changes, so serialize it once at import
+HEALTHY_RESPONSE = Response(content=b'{"status":"healthy"}', media_type="application/json")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return HEALTHY_RESPONSE
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt).
+    # Multiple workers need the app as an import string.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count()
+    )
\ No newline at end of file
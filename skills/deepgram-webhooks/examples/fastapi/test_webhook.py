@@ -1,13 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
-from main import app
 import os
 
+# Test data
+valid_api_key_id = "test_api_key_id_12345"
+
+# Set the API key ID before importing the app, which reads it at import
+os.environ["DEEPGRAM_API_KEY_ID"] = valid_api_key_id
+
+from main import app
+
 # Test client
 client = TestClient(app)
 
-# Test data
-valid_api_key_id = "test_api_key_id_12345"
 valid_payload = {
     "request_id": "req_123456789",
     "created": "2024-01-20T10:30:00.000Z",
@@ -45,13 +50,6 @@ valid_payload = {
     }
 }
 
-@pytest.fixture(autouse=True)
-def setup_env():
-    """Set up test environment variables"""
-    os.environ["DEEPGRAM_API_KEY_ID"] = valid_api_key_id
-    yield
-    # Cleanup if needed
-
 class TestDeepgramWebhook:
     def test_valid_webhook(self):
         """Test accepting valid webhook with correct dg-token"""
@@ -138,6 +136,19 @@ class TestDeepgramWebhook:
         )
         assert response.status_code == 200
 
+    @pytest.mark.parametrize("results", [
+        {"channels": []},
+        {"channels": [{"alternatives": []}]},
+    ])
+    def test_no_alternatives(self, results):
+        """Test accepting a result with no channels or alternatives"""
+        response = client.post(
+            "/webhooks/deepgram",
+            json={**valid_payload, "results": results},
+            headers={"dg-token": valid_api_key_id}
+        )
+        assert response.status_code == 200
+
     def test_invalid_json(self):
         """Test rejecting invalid JSON payload"""
         response = client.post(
@@ -1,11 +1,13 @@
 import os
+import re
 import hmac
-import hashlib
+import binascii
 import time
-from typing import Optional
+from typing import Any, Dict, List, Tuple
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, HTTPException, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi.responses import Response
 import logging
 
 # Load environment variables
@@ -23,33 +25,45 @@ WEBHOOK_SECRET = os.getenv('ELEVENLABS_WEBHOOK_SECRET', '')
 if not WEBHOOK_SECRET:
     logger.warning("ELEVENLABS_WEBHOOK_SECRET not set!")
 
+# The secret is fixed for the life of the process, so key the HMAC once and
+# copy it per request instead of re-deriving the padded key blocks each time.
+# Without a secret it stays None, so nothing is checked against an empty key.
+WEBHOOK_HMAC = hmac.new(WEBHOOK_SECRET.encode(), digestmod='sha256') if WEBHOOK_SECRET else None
 
-def verify_elevenlabs_webhook(
-    raw_body: bytes,
-    signature_header: str,
-    secret: str
-) -> bool:
+# Matches each "t=..." / "v0=..." element of the signature header
+SIGNATURE_ELEMENT_RE = re.compile(rb'(?:^|,)(t|v0)=([^,]+)')
+
+# Length of a hex-encoded HMAC-SHA256 signature; the length is public, so
+# filtering on it leaks nothing about the secret
+SIGNATURE_HEX_LENGTH = 64
+
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+def parse_signature_header(signature_header: bytes) -> Tuple[bytes, List[bytes]]:
     """
-    Verify ElevenLabs webhook signature
-    Referenced from elevenlabs-webhooks skill
+    Split an ElevenLabs signature header into its timestamp and signatures,
+    rejecting malformed headers and stale timestamps before any hashing
     """
     if not signature_header:
         raise ValueError('No signature header provided')
 
     # Parse the signature header: "t=timestamp,v0=signature"
-    elements = signature_header.split(',')
-    timestamp = None
-    signatures = []
-
-    for element in elements:
-        if element.startswith('t='):
-            timestamp = element[2:]
-        elif element.startswith('v0='):
-            signatures.append(element[3:])
+    elements = SIGNATURE_ELEMENT_RE.findall(signature_header)
+    timestamp = next((value for key, value in elements if key == b't'), None)
+    signatures = [
+        value for key, value in elements
+        if key == b'v0' and len(value) == SIGNATURE_HEX_LENGTH
+    ]
 
     if not timestamp or not signatures:
         raise ValueError('Invalid signature header format')
 
+    # A Unix timestamp in seconds has at most 11 digits
+    if len(timestamp) > 11 or not timestamp.isdigit():
+        raise ValueError('Invalid signature header format')
+
     # Verify timestamp is within tolerance (30 minutes)
     current_time = int(time.time())
     timestamp_age = abs(current_time - int(timestamp))
@@ -57,15 +71,22 @@ def verify_elevenlabs_webhook(
     if timestamp_age > 1800:
         raise ValueError('Webhook timestamp too old')
 
-    # Create the signed payload
-    signed_payload = f"{timestamp}.{raw_body.decode('utf-8')}"
+    return timestamp, signatures
 
-    # Calculate expected signature
-    expected_signature = hmac.new(
-        secret.encode(),
-        signed_payload.encode(),
-        hashlib.sha256
-    ).hexdigest()
+
+def verify_elevenlabs_webhook(
+    mac: hmac.HMAC,
+    signatures: List[bytes]
+) -> bool:
+    """
+    Verify ElevenLabs webhook signature
+    Referenced from elevenlabs-webhooks skill
+
+    `mac` must already have been fed the signed payload "{timestamp}.{body}",
+    and `signatures` should come from parse_signature_header, which drops
+    candidates of the wrong length.
+    """
+    expected_signature = binascii.hexlify(mac.digest())
 
     # Timing-safe comparison
     is_valid = any(
@@ -79,79 +100,132 @@ def verify_elevenlabs_webhook(
     return True
 
 
+def handle_post_call_transcription(data: Dict[str, Any]) -> None:
+    # Handle call transcription completion
+    logger.info("Call transcription completed: %s", data.get('call_id'))
+    # Add your business logic here
+
+
+def handle_voice_removal_notice(data: Dict[str, Any]) -> None:
+    # Handle voice removal notice
+    logger.info("Voice removal notice received: %s", data)
+    # Add logic to handle voice removal notice
+
+
+def handle_voice_removal_notice_withdrawn(data: Dict[str, Any]) -> None:
+    # Handle voice removal notice withdrawal
+    logger.info("Voice removal notice withdrawn: %s", data)
+    # Add logic to handle notice withdrawal
+
+
+def handle_voice_removed(data: Dict[str, Any]) -> None:
+    # Handle voice removal completion
+    logger.info("Voice removed: %s", data)
+    # Add logic to handle voice removal completion
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "post_call_transcription": handle_post_call_transcription,
+    "voice_removal_notice": handle_voice_removal_notice,
+    "voice_removal_notice_withdrawn": handle_voice_removal_notice_withdrawn,
+    "voice_removed": handle_voice_removed,
+}
+
+
+# Health checks and acknowledgements share one constant body, serialized once
+OK_RESPONSE = Response(content=b'{"status":"ok"}', media_type="application/json")
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok"}
+    return OK_RESPONSE
+
+
+# Dependency that reads and parses the signature header before the body
+async def elevenlabs_signature(request: Request) -> Tuple[bytes, List[bytes]]:
+    """Return the (timestamp, signatures) pair from the ElevenLabs-Signature header"""
+    # Read the header as raw bytes (ASGI lowercases header names)
+    signature_header = next(
+        (value for name, value in request.headers.raw if name == b'elevenlabs-signature'),
+        None
+    )
+
+    if not signature_header:
+        raise HTTPException(status_code=400, detail="Missing signature header")
+
+    try:
+        return parse_signature_header(signature_header)
+    except ValueError as e:
+        logger.error("Webhook verification failed: %s", e)
+        raise HTTPException(status_code=400, detail="Invalid signature")
 
 
 @app.post("/webhooks/elevenlabs")
 async def elevenlabs_webhook(
     request: Request,
-    elevenlabs_signature: Optional[str] = Header(None, alias="ElevenLabs-Signature")
+    signature: Tuple[bytes, List[bytes]] = Depends(elevenlabs_signature)
 ):
     """Handle ElevenLabs webhooks"""
+    timestamp, signatures = signature
 
-    # Try both header cases
-    if not elevenlabs_signature:
-        elevenlabs_signature = request.headers.get('elevenlabs-signature')
+    if WEBHOOK_HMAC is None:
+        logger.error("ELEVENLABS_WEBHOOK_SECRET not configured")
+        raise HTTPException(status_code=500, detail="Webhook secret not configured")
 
-    if not elevenlabs_signature:
-        raise HTTPException(status_code=400, detail="Missing signature header")
+    # Stream the body into a copy of the pre-keyed HMAC as it arrives,
+    # keeping the bytes only for parsing once the signature checks out
+    mac = WEBHOOK_HMAC.copy()
+    mac.update(timestamp)
+    mac.update(b".")
+    raw_body = bytearray()
 
-    # Get raw body
-    raw_body = await request.body()
+    async for chunk in request.stream():
+        raw_body += chunk
+        if len(raw_body) > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        mac.update(chunk)
 
     try:
         # Verify webhook signature
-        verify_elevenlabs_webhook(
-            raw_body,
-            elevenlabs_signature,
-            WEBHOOK_SECRET
-        )
+        verify_elevenlabs_webhook(mac, signatures)
 
         # Parse the webhook payload
-        import json
-        event = json.loads(raw_body)
-
-        logger.info(f"Received ElevenLabs webhook: {event['type']}")
-
-        # Process based on event type
-        if event['type'] == 'post_call_transcription':
-            # Handle call transcription completion
-            logger.info(f"Call transcription completed: {event['data'].get('call_id')}")
-            # Add your business logic here
-
-        elif event['type'] == 'voice_removal_notice':
-            # Handle voice removal notice
-            logger.info(f"Voice removal notice received: {event['data']}")
-            # Add logic to handle voice removal notice
-
-        elif event['type'] == 'voice_removal_notice_withdrawn':
-            # Handle voice removal notice withdrawal
-            logger.info(f"Voice removal notice withdrawn: {event['data']}")
-            # Add logic to handle notice withdrawal
+        event = orjson.loads(raw_body)
 
-        elif event['type'] == 'voice_removed':
-            # Handle voice removal completion
-            logger.info(f"Voice removed: {event['data']}")
-            # Add logic to handle voice removal completion
+        event_type = event['type']
+        logger.info("Received ElevenLabs webhook: %s", event_type)
 
+        # Dispatch to the handler for this event type
+        handler = EVENT_HANDLERS.get(event_type)
+        if handler:
+            handler(event['data'])
         else:
-            logger.info(f"Unknown event type: {event['type']}")
+            logger.info("Unknown event type: %s", event_type)
 
         # Return 200 to acknowledge receipt
-        return {"status": "ok"}
+        return OK_RESPONSE
 
     except ValueError as e:
-        logger.error(f"Webhook verification failed: {str(e)}")
+        logger.error("Webhook verification failed: %s", e)
         raise HTTPException(status_code=400, detail="Invalid signature")
 
     except Exception as e:
-        logger.error(f"Webhook processing failed: {str(e)}")
+        logger.error("Webhook processing failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000)
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt).
+    # Multiple workers need the app as an import string.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=3000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count()
+    )
\ No newline at end of file
@@ -1,26 +1,27 @@
 import os
-import json
 import hmac
 import hashlib
 import time
 import pytest
+import orjson
 
 # Set test environment variables BEFORE importing the app
 os.environ['ELEVENLABS_WEBHOOK_SECRET'] = 'test_webhook_secret'
 
 from fastapi.testclient import TestClient
+import main
 from main import app
 
 client = TestClient(app)
 
 
-def generate_test_signature(payload: str, secret: str, timestamp: int = None) -> dict:
+def generate_test_signature(payload: bytes, secret: str, timestamp: int = None) -> dict:
     """Generate a test signature matching ElevenLabs format"""
     ts = timestamp or int(time.time())
-    signed_payload = f"{ts}.{payload}"
+    signed_payload = f"{ts}.".encode() + payload
     signature = hmac.new(
         secret.encode(),
-        signed_payload.encode(),
+        signed_payload,
         hashlib.sha256
     ).hexdigest()
     return {
@@ -29,32 +30,68 @@ def generate_test_signature(payload: str, secret: str, timestamp: int = None) ->
     }
 
 
+EVENT_TYPES = [
+    "post_call_transcription",
+    "voice_removal_notice",
+    "voice_removal_notice_withdrawn",
+    "voice_removed"
+]
+
+
+def make_payload(event_type: str, data: dict) -> bytes:
+    return orjson.dumps({
+        "type": event_type,
+        "data": data,
+        "event_timestamp": "2024-01-20T10:30:00Z"
+    })
+
+
+@pytest.fixture(scope="module")
+def signed():
+    """Payloads and their signature headers, signed once for the module"""
+    secret = os.environ['ELEVENLABS_WEBHOOK_SECRET']
+    payloads = {
+        "valid": make_payload("post_call_transcription", {
+            "call_id": "test_call_123",
+            "transcript": {
+                "text": "Test transcription",
+                "segments": []
+            }
+        }),
+        "lowercase": make_payload("voice_removed", {"voice_id": "test_voice_456"}),
+        "multiple": make_payload("voice_removal_notice", {"voice_id": "test_voice_789"}),
+        "oversized": make_payload("post_call_transcription", {"call_id": "test_call_123", "padding": "x" * 100}),
+        **{
+            event_type: make_payload(event_type, {"test_id": f"test_{event_type}"})
+            for event_type in EVENT_TYPES
+        }
+    }
+    signed = {
+        key: (payload, generate_test_signature(payload, secret)['header'])
+        for key, payload in payloads.items()
+    }
+
+    # Signed with a timestamp 40 minutes ago
+    expired = make_payload("post_call_transcription", {"call_id": "test_call_123"})
+    signed["expired"] = (expired, generate_test_signature(expired, secret, int(time.time()) - 2400)['header'])
+
+    return signed
+
+
 class TestElevenLabsWebhookHandler:
     def test_health_check(self):
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
-    def test_valid_webhook_signature(self):
-        payload = json.dumps({
-            "type": "post_call_transcription",
-            "data": {
-                "call_id": "test_call_123",
-                "transcript": {
-                    "text": "Test transcription",
-                    "segments": []
-                }
-            },
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
-
-        sig_data = generate_test_signature(payload, os.environ['ELEVENLABS_WEBHOOK_SECRET'])
+    def test_valid_webhook_signature(self, signed):
+        payload, signature = signed["valid"]
 
         response = client.post(
             "/webhooks/elevenlabs",
             content=payload,
             headers={
-                "ElevenLabs-Signature": sig_data['header'],
+                "ElevenLabs-Signature": signature,
                 "Content-Type": "application/json"
             }
         )
@@ -62,12 +99,24 @@ class TestElevenLabsWebhookHandler:
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
+    def test_secret_not_configured(self, signed, monkeypatch):
+        monkeypatch.setattr(main, 'WEBHOOK_HMAC', None)
+        payload, signature = signed["valid"]
+
+        response = client.post(
+            "/webhooks/elevenlabs",
+            content=payload,
+            headers={
+                "ElevenLabs-Signature": signature,
+                "Content-Type": "application/json"
+            }
+        )
+
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Webhook secret not configured"
+
     def test_invalid_webhook_signature(self):
-        payload = json.dumps({
-            "type": "post_call_transcription",
-            "data": {"call_id": "test_call_123"},
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
+        payload = make_payload("post_call_transcription", {"call_id": "test_call_123"})
 
         response = client.post(
             "/webhooks/elevenlabs",
@@ -82,11 +131,7 @@ class TestElevenLabsWebhookHandler:
         assert "Invalid signature" in response.json()["detail"]
 
     def test_missing_signature_header(self):
-        payload = json.dumps({
-            "type": "post_call_transcription",
-            "data": {"call_id": "test_call_123"},
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
+        payload = make_payload("post_call_transcription", {"call_id": "test_call_123"})
 
         response = client.post(
             "/webhooks/elevenlabs",
@@ -97,26 +142,14 @@ class TestElevenLabsWebhookHandler:
         assert response.status_code == 400
         assert "Missing signature header" in response.json()["detail"]
 
-    def test_expired_timestamp(self):
-        payload = json.dumps({
-            "type": "post_call_transcription",
-            "data": {"call_id": "test_call_123"},
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
-
-        # Create signature with timestamp 40 minutes ago
-        old_timestamp = int(time.time()) - 2400
-        sig_data = generate_test_signature(
-            payload,
-            os.environ['ELEVENLABS_WEBHOOK_SECRET'],
-            old_timestamp
-        )
+    def test_expired_timestamp(self, signed):
+        payload, signature = signed["expired"]
 
         response = client.post(
             "/webhooks/elevenlabs",
             content=payload,
             headers={
-                "ElevenLabs-Signature": sig_data['header'],
+                "ElevenLabs-Signature": signature,
                 "Content-Type": "application/json"
             }
         )
@@ -124,20 +157,29 @@ class TestElevenLabsWebhookHandler:
         assert response.status_code == 400
         assert "Invalid signature" in response.json()["detail"]
 
-    def test_lowercase_signature_header(self):
-        payload = json.dumps({
-            "type": "voice_removed",
-            "data": {"voice_id": "test_voice_456"},
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
+    def test_non_numeric_timestamp(self):
+        payload = make_payload("post_call_transcription", {"call_id": "test_call_123"})
 
-        sig_data = generate_test_signature(payload, os.environ['ELEVENLABS_WEBHOOK_SECRET'])
+        response = client.post(
+            "/webhooks/elevenlabs",
+            content=payload,
+            headers={
+                "ElevenLabs-Signature": f"t=not_a_number,v0={'0' * 64}",
+                "Content-Type": "application/json"
+            }
+        )
+
+        assert response.status_code == 400
+        assert "Invalid signature" in response.json()["detail"]
+
+    def test_lowercase_signature_header(self, signed):
+        payload, signature = signed["lowercase"]
 
         response = client.post(
             "/webhooks/elevenlabs",
             content=payload,
             headers={
-                "elevenlabs-signature": sig_data['header'],  # lowercase header
+                "elevenlabs-signature": signature,  # lowercase header
                 "Content-Type": "application/json"
             }
         )
@@ -145,16 +187,10 @@ class TestElevenLabsWebhookHandler:
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
-    def test_multiple_signatures_in_header(self):
-        payload = json.dumps({
-            "type": "voice_removal_notice",
-            "data": {"voice_id": "test_voice_789"},
-            "event_timestamp": "2024-01-20T10:30:00Z"
-        })
-
-        sig_data = generate_test_signature(payload, os.environ['ELEVENLABS_WEBHOOK_SECRET'])
+    def test_multiple_signatures_in_header(self, signed):
+        payload, signature = signed["multiple"]
         # Add an invalid signature to the header
-        multi_sig_header = f"{sig_data['header']},v0=invalid_signature_here"
+        multi_sig_header = f"{signature},v0=invalid_signature_here"
 
         response = client.post(
             "/webhooks/elevenlabs",
@@ -168,31 +204,33 @@ class TestElevenLabsWebhookHandler:
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
-    def test_all_event_types(self):
-        event_types = [
-            "post_call_transcription",
-            "voice_removal_notice",
-            "voice_removal_notice_withdrawn",
-            "voice_removed"
-        ]
+    def test_oversized_body(self, signed, monkeypatch):
+        monkeypatch.setattr(main, 'MAX_BODY_SIZE', 64)
+        payload, signature = signed["oversized"]
+
+        response = client.post(
+            "/webhooks/elevenlabs",
+            content=payload,
+            headers={
+                "ElevenLabs-Signature": signature,
+                "Content-Type": "application/json"
+            }
+        )
 
-        for event_type in event_types:
-            payload = json.dumps({
-                "type": event_type,
-                "data": {"test_id": f"test_{event_type}"},
-                "event_timestamp": "2024-01-20T10:30:00Z"
-            })
+        assert response.status_code == 413
 
-            sig_data = generate_test_signature(payload, os.environ['ELEVENLABS_WEBHOOK_SECRET'])
+    def test_all_event_types(self, signed):
+        for event_type in EVENT_TYPES:
+            payload, signature = signed[event_type]
 
             response = client.post(
                 "/webhooks/elevenlabs",
                 content=payload,
                 headers={
-                    "ElevenLabs-Signature": sig_data['header'],
+                    "ElevenLabs-Signature": signature,
                     "Content-Type": "application/json"
                 }
             )
 
             assert response.status_code == 200
-            assert response.json() == {"status": "ok"}
\ No newline at end of file
+            assert response.json() == {"status": "ok"}
@@ -2,18 +2,53 @@
 # https://github.com/hookdeck/webhook-skills
 
 import os
+import hmac
 import hashlib
 import base64
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException
 import jwt
 
 load_dotenv()
 
-app = FastAPI()
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 webhook_secret = os.environ.get("FUSIONAUTH_WEBHOOK_SECRET")
 
+# The HMAC algorithm of the signing key in Key Master. Pinning a single
+# algorithm saves PyJWT trying others and rejects tokens signed with any
+# other algorithm.
+jwt_algorithm = os.environ.get("FUSIONAUTH_JWT_ALGORITHM", "HS256")
+
+# The webhook secret is a shared HMAC key, so only HMAC algorithms can work.
+# Anything else would make PyJWT raise on every request, so fail at startup.
+if jwt_algorithm not in {"HS256", "HS384", "HS512"}:
+    raise ValueError("FUSIONAUTH_JWT_ALGORITHM must be one of HS256, HS384 or HS512")
+
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 5 * 1024 * 1024
+
 
 def verify_fusionauth_webhook(raw_body: bytes, signature_jwt: str, secret: str) -> bool:
     """
@@ -21,6 +56,14 @@ def verify_fusionauth_webhook(raw_body: bytes, signature_jwt: str, secret: str)
     FusionAuth sends a JWT in X-FusionAuth-Signature-JWT header containing
     a request_body_sha256 claim with the Base64-encoded SHA-256 hash of the body.
     """
+    return verify_fusionauth_signature(hashlib.sha256(raw_body).digest(), signature_jwt, secret)
+
+
+def verify_fusionauth_signature(body_sha256: bytes, signature_jwt: str, secret: str) -> bool:
+    """
+    Verify a FusionAuth signature JWT against the SHA-256 digest of the body,
+    for callers that hash the body as it streams in.
+    """
     if not signature_jwt or not secret:
         return False
 
@@ -29,88 +72,147 @@ def verify_fusionauth_webhook(raw_body: bytes, signature_jwt: str, secret: str)
         payload = jwt.decode(
             signature_jwt,
             secret,
-            algorithms=["HS256", "HS384", "HS512"]
+            algorithms=[jwt_algorithm]
         )
 
-        # Calculate SHA-256 hash of request body (base64 encoded)
-        body_hash = base64.b64encode(hashlib.sha256(raw_body).digest()).decode()
+        claimed_hash = payload.get("request_body_sha256")
+        if not isinstance(claimed_hash, str):
+            return False
 
-        # Compare hash from JWT claim with calculated hash
-        return payload.get("request_body_sha256") == body_hash
+        # Compare the claim with the base64-encoded body hash as bytes
+        # (timing-safe), without decoding the encoded hash to str
+        return hmac.compare_digest(claimed_hash.encode(), base64.b64encode(body_sha256))
     except jwt.InvalidTokenError as e:
-        print(f"JWT verification failed: {e}")
+        logger.warning("JWT verification failed: %s", e)
         return False
 
 
-@app.post("/webhooks/fusionauth")
-async def fusionauth_webhook(request: Request):
-    # Get the raw body for signature verification
-    payload = await request.body()
-    signature_jwt = request.headers.get("x-fusionauth-signature-jwt")
+async def read_and_hash(request: Request, hasher) -> bytes:
+    """Read the request body, feeding each chunk to `hasher` as it arrives."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        # Content-Length can be absent (chunked encoding), so count as we go
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        hasher.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks)
 
-    # Verify signature if secret is configured
-    if webhook_secret:
-        if not verify_fusionauth_webhook(payload, signature_jwt, webhook_secret):
-            raise HTTPException(status_code=401, detail="Invalid signature")
 
-    # Parse the verified webhook body
-    try:
-        import json
-        event = json.loads(payload.decode())
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+def handle_user_create(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User created: %s", user.get('id'))
+    # TODO: Sync user to external systems, send welcome email, etc.
+
+
+def handle_user_update(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User updated: %s", user.get('id'))
+    # TODO: Sync user changes to external systems
+
+
+def handle_user_delete(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User deleted: %s", user.get('id'))
+    # TODO: Clean up user data, handle GDPR compliance
 
-    # Handle the event based on type
-    event_type = event.get("event", {}).get("type")
-    user = event.get("event", {}).get("user", {})
-    application_id = event.get("event", {}).get("applicationId")
 
-    if event_type == "user.create":
-        print(f"User created: {user.get('id')}")
-        # TODO: Sync user to external systems, send welcome email, etc.
+def handle_user_deactivate(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User deactivated: %s", user.get('id'))
+    # TODO: Revoke access, notify admins
 
-    elif event_type == "user.update":
-        print(f"User updated: {user.get('id')}")
-        # TODO: Sync user changes to external systems
 
-    elif event_type == "user.delete":
-        print(f"User deleted: {user.get('id')}")
-        # TODO: Clean up user data, handle GDPR compliance
+def handle_user_reactivate(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User reactivated: %s", user.get('id'))
+    # TODO: Restore access
 
-    elif event_type == "user.deactivate":
-        print(f"User deactivated: {user.get('id')}")
-        # TODO: Revoke access, notify admins
 
-    elif event_type == "user.reactivate":
-        print(f"User reactivated: {user.get('id')}")
-        # TODO: Restore access
+def handle_user_login_success(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User logged in: %s", user.get('id'))
+    # TODO: Audit logging, session tracking
 
-    elif event_type == "user.login.success":
-        print(f"User logged in: {user.get('id')}")
-        # TODO: Audit logging, session tracking
 
-    elif event_type == "user.login.failed":
-        print(f"Login failed for: {user.get('email', 'unknown')}")
-        # TODO: Security monitoring, rate limiting
+def handle_user_login_failed(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("Login failed for: %s", user.get('email', 'unknown'))
+    # TODO: Security monitoring, rate limiting
 
-    elif event_type == "user.registration.create":
-        print(f"User registered: {user.get('id')} for app: {application_id}")
-        # TODO: Provision app-specific access
 
-    elif event_type == "user.registration.update":
-        print(f"Registration updated: {user.get('id')}")
-        # TODO: Sync role changes
+def handle_user_registration_create(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("User registered: %s for app: %s", user.get('id'), application_id)
+    # TODO: Provision app-specific access
 
-    elif event_type == "user.registration.delete":
-        print(f"Registration deleted: {user.get('id')}")
-        # TODO: Revoke app access
 
-    elif event_type == "user.email.verified":
-        print(f"Email verified for: {user.get('id')}")
-        # TODO: Enable features requiring verified email
+def handle_user_registration_update(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("Registration updated: %s", user.get('id'))
+    # TODO: Sync role changes
+
+
+def handle_user_registration_delete(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("Registration deleted: %s", user.get('id'))
+    # TODO: Revoke app access
+
+
+def handle_user_email_verified(user: Dict[str, Any], application_id: Optional[str]) -> None:
+    logger.info("Email verified for: %s", user.get('id'))
+    # TODO: Enable features requiring verified email
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "user.create": handle_user_create,
+    "user.update": handle_user_update,
+    "user.delete": handle_user_delete,
+    "user.deactivate": handle_user_deactivate,
+    "user.reactivate": handle_user_reactivate,
+    "user.login.success": handle_user_login_success,
+    "user.login.failed": handle_user_login_failed,
+    "user.registration.create": handle_user_registration_create,
+    "user.registration.update": handle_user_registration_update,
+    "user.registration.delete": handle_user_registration_delete,
+    "user.email.verified": handle_user_email_verified,
+}
+
+
+@app.post("/webhooks/fusionauth")
+async def fusionauth_webhook(request: Request):
+    # Reject oversized bodies from the Content-Length header before reading
+    # or hashing anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
+    signature_jwt = request.headers.get("x-fusionauth-signature-jwt")
+
+    # Hash the body chunk by chunk as it arrives. The body is always read
+    # through read_and_hash so the size limit applies even without a secret.
+    body_hash = hashlib.sha256()
+    payload = await read_and_hash(request, body_hash)
+
+    # Verify signature if secret is configured
+    if webhook_secret:
+        if not verify_fusionauth_signature(body_hash.digest(), signature_jwt, webhook_secret):
+            raise HTTPException(status_code=401, detail="Invalid signature")
+
+    # Parse the verified webhook body
+    try:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    # Look the event envelope up once rather than repeating
+    # event.get("event", {}) for each field
+    details = event.get("event") if isinstance(event, dict) else None
+    if isinstance(details, dict) and isinstance(details.get("type"), str):
+        event_type = details["type"]
+        user = details.get("user", {})
+        application_id = details.get("applicationId")
+    else:
+        event_type, user, application_id = None, {}, None
 
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler:
+        handler(user, application_id)
     else:
-        print(f"Unhandled event type: {event_type}")
+        logger.info("Unhandled event type: %s", event_type)
 
     # Return 200 to acknowledge receipt
     return {"received": True}
@@ -123,4 +225,13 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=3000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning"
+    )
@@ -101,6 +101,20 @@ class TestFusionAuthWebhook:
         assert response.status_code == 200
         assert response.json() == {"received": True}
 
+    def test_oversized_body_without_secret_returns_413(self, monkeypatch):
+        """Should enforce the size limit when no secret is configured."""
+        monkeypatch.setattr("main.webhook_secret", None)
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        payload = json.dumps({"event": {"type": "user.create"}}).encode()
+
+        # A generator body is sent chunked, without a Content-Length header
+        response = client.post(
+            "/webhooks/fusionauth",
+            content=(chunk for chunk in (payload[:10], payload[10:])),
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 413
+
     def test_tampered_payload_returns_401(self):
         """Should return 401 when payload has been tampered with."""
         original_payload = json.dumps({
@@ -206,6 +220,12 @@ class TestVerifyFusionAuthWebhook:
         result = verify_fusionauth_webhook(b'{"test": false}', jwt_token, self.secret)
         assert result is False
 
+    def test_returns_false_for_missing_body_hash_claim(self):
+        """Should return False when the JWT has no request_body_sha256 claim."""
+        jwt_token = jwt.encode({"sub": "test"}, self.secret, algorithm="HS256")
+        result = verify_fusionauth_webhook(b"{}", jwt_token, self.secret)
+        assert result is False
+
 
 class TestHealth:
     """Tests for health endpoint."""
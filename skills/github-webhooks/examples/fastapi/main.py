@@ -1,91 +1,175 @@
 import os
 import hmac
 import hashlib
-import json
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import orjson
+from typing import Any, Dict
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException
 
 load_dotenv()
 
-app = FastAPI()
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 github_secret = os.environ.get("GITHUB_WEBHOOK_SECRET")
+github_secret_bytes = (github_secret or "").encode("utf-8")
 
+SIGNATURE_PREFIX = "sha256="
 
-def verify_github_webhook(raw_body: bytes, signature_header: str, secret: str) -> bool:
-    """Verify GitHub webhook signature."""
-    if not signature_header:
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 5 * 1024 * 1024
+
+
+def signature_matches(signature_header: str, expected_digest: bytes) -> bool:
+    """Check a signature header against the expected raw HMAC-SHA256 digest."""
+    # Extract the signature from the header (format: sha256=<hex>) and
+    # decode it, so the comparison is over raw digest bytes
+    if not signature_header.startswith(SIGNATURE_PREFIX):
         return False
 
-    # Extract the signature from the header (format: sha256=<hex>)
-    signature = signature_header.replace("sha256=", "")
+    try:
+        signature = bytes.fromhex(signature_header[len(SIGNATURE_PREFIX):])
+    except ValueError:
+        return False
+
+    # Use timing-safe comparison
+    return hmac.compare_digest(signature, expected_digest)
+
+
+def verify_github_webhook(raw_body: bytes, signature_header: str, secret: bytes) -> bool:
+    """Verify GitHub webhook signature."""
+    if not signature_header or not secret:
+        return False
 
     # Compute expected signature
-    expected_signature = hmac.new(
-        secret.encode("utf-8"),
-        raw_body,
-        hashlib.sha256
-    ).hexdigest()
+    expected_digest = hmac.digest(secret, raw_body, "sha256")
+
+    return signature_matches(signature_header, expected_digest)
+
+
+async def read_and_hash(request: Request, hasher) -> bytes:
+    """Read the request body, feeding each chunk to `hasher` as it arrives."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        # Content-Length can be absent (chunked encoding), so count as we go
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        hasher.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def handle_ping(payload: Dict[str, Any]) -> None:
+    logger.info("Ping received: %s", payload.get('zen'))
 
-    # Use timing-safe comparison
-    return hmac.compare_digest(signature, expected_signature)
+
+def handle_push(payload: Dict[str, Any]) -> None:
+    head_commit = payload.get("head_commit", {})
+    logger.info("Push to %s: %s", payload['ref'], head_commit.get('message'))
+    # TODO: Trigger CI/CD, run tests, deploy, etc.
+
+
+def handle_pull_request(payload: Dict[str, Any]) -> None:
+    pr = payload["pull_request"]
+    logger.info("PR #%s %s: %s", payload['number'], payload.get('action'), pr['title'])
+    # TODO: Run checks, notify reviewers, auto-merge, etc.
+
+
+def handle_issues(payload: Dict[str, Any]) -> None:
+    issue = payload["issue"]
+    logger.info("Issue #%s %s: %s", issue['number'], payload.get('action'), issue['title'])
+    # TODO: Triage, label, notify, etc.
+
+
+def handle_issue_comment(payload: Dict[str, Any]) -> None:
+    issue = payload["issue"]
+    comment = payload["comment"]
+    logger.info("Comment on #%s by %s", issue['number'], comment['user']['login'])
+    # TODO: Bot responses, command parsing, etc.
+
+
+def handle_release(payload: Dict[str, Any]) -> None:
+    release = payload["release"]
+    logger.info("Release %s: %s", payload.get('action'), release['tag_name'])
+    # TODO: Deploy, notify, update changelog, etc.
+
+
+def handle_workflow_run(payload: Dict[str, Any]) -> None:
+    workflow_run = payload["workflow_run"]
+    logger.info("Workflow \"%s\" %s", workflow_run['name'], workflow_run['conclusion'])
+    # TODO: Post-CI automation, notifications, etc.
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "ping": handle_ping,
+    "push": handle_push,
+    "pull_request": handle_pull_request,
+    "issues": handle_issues,
+    "issue_comment": handle_issue_comment,
+    "release": handle_release,
+    "workflow_run": handle_workflow_run,
+}
 
 
 @app.post("/webhooks/github")
 async def github_webhook(request: Request):
-    # Get the raw body for signature verification
-    raw_body = await request.body()
+    # Reject oversized bodies from the Content-Length header before reading
+    # or hashing anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
     signature_header = request.headers.get("x-hub-signature-256")
     event = request.headers.get("x-github-event")
     delivery_id = request.headers.get("x-github-delivery")
 
+    if not github_secret_bytes:
+        raise HTTPException(status_code=500, detail="Webhook secret not configured")
+
+    if not signature_header:
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    # Feed the body into the HMAC chunk by chunk as it arrives, keeping
+    # the raw bytes for parsing once the signature is verified
+    mac = hmac.new(github_secret_bytes, digestmod=hashlib.sha256)
+    raw_body = await read_and_hash(request, mac)
+
     # Verify webhook signature
-    if not verify_github_webhook(raw_body, signature_header, github_secret):
+    if not signature_matches(signature_header, mac.digest()):
         raise HTTPException(status_code=401, detail="Invalid signature")
 
     # Parse the payload after verification
-    payload = json.loads(raw_body)
-    action = payload.get("action")
+    payload = orjson.loads(raw_body)
 
-    print(f"Received {event} event (delivery: {delivery_id})")
+    logger.info("Received %s event (delivery: %s)", event, delivery_id)
 
     # Handle the event based on type
-    if event == "ping":
-        print(f"Ping received: {payload.get('zen')}")
-
-    elif event == "push":
-        head_commit = payload.get("head_commit", {})
-        print(f"Push to {payload['ref']}: {head_commit.get('message')}")
-        # TODO: Trigger CI/CD, run tests, deploy, etc.
-
-    elif event == "pull_request":
-        pr = payload["pull_request"]
-        print(f"PR #{payload['number']} {action}: {pr['title']}")
-        # TODO: Run checks, notify reviewers, auto-merge, etc.
-
-    elif event == "issues":
-        issue = payload["issue"]
-        print(f"Issue #{issue['number']} {action}: {issue['title']}")
-        # TODO: Triage, label, notify, etc.
-
-    elif event == "issue_comment":
-        issue = payload["issue"]
-        comment = payload["comment"]
-        print(f"Comment on #{issue['number']} by {comment['user']['login']}")
-        # TODO: Bot responses, command parsing, etc.
-
-    elif event == "release":
-        release = payload["release"]
-        print(f"Release {action}: {release['tag_name']}")
-        # TODO: Deploy, notify, update changelog, etc.
-
-    elif event == "workflow_run":
-        workflow_run = payload["workflow_run"]
-        print(f"Workflow \"{workflow_run['name']}\" {workflow_run['conclusion']}")
-        # TODO: Post-CI automation, notifications, etc.
-
+    handler = EVENT_HANDLERS.get(event)
+    if handler:
+        handler(payload)
     else:
-        print(f"Unhandled event: {event}")
+        logger.info("Unhandled event: %s", event)
 
     # Return 200 to acknowledge receipt
     return {"received": True}
@@ -98,4 +182,13 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=3000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning"
+    )
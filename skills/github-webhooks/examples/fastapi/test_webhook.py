@@ -27,25 +27,33 @@ class TestVerifyGitHubWebhook:
     """Tests for GitHub signature verification function."""
     
     secret = os.environ["GITHUB_WEBHOOK_SECRET"]
+    secret_bytes = secret.encode("utf-8")
 
     def test_valid_signature_returns_true(self):
         """Should return True for valid signature."""
         payload = b'{"action":"opened"}'
         signature = generate_github_signature(payload.decode(), self.secret)
         
-        assert verify_github_webhook(payload, signature, self.secret) is True
+        assert verify_github_webhook(payload, signature, self.secret_bytes) is True
 
     def test_invalid_signature_returns_false(self):
         """Should return False for invalid signature."""
         payload = b'{"action":"opened"}'
         
-        assert verify_github_webhook(payload, "sha256=invalid", self.secret) is False
+        assert verify_github_webhook(payload, "sha256=invalid", self.secret_bytes) is False
 
     def test_missing_signature_returns_false(self):
         """Should return False for missing signature."""
         payload = b'{"action":"opened"}'
         
-        assert verify_github_webhook(payload, None, self.secret) is False
+        assert verify_github_webhook(payload, None, self.secret_bytes) is False
+
+    def test_wrong_prefix_returns_false(self):
+        """Should return False when the header does not start with sha256=."""
+        payload = b'{"action":"opened"}'
+        signature = generate_github_signature(payload.decode(), self.secret)
+
+        assert verify_github_webhook(payload, "xxxxxxx" + signature[7:], self.secret_bytes) is False
 
 
 class TestGitHubWebhook:
@@ -83,6 +91,25 @@ class TestGitHubWebhook:
         )
         assert response.status_code == 401
 
+    def test_oversized_body_returns_413(self, monkeypatch):
+        """Should return 413 when a chunked body grows past the size limit."""
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        payload = json.dumps({"ref": "refs/heads/main"})
+        signature = generate_github_signature(payload, self.secret)
+
+        # A generator body is sent chunked, without a Content-Length header
+        response = client.post(
+            "/webhooks/github",
+            content=(chunk.encode() for chunk in (payload[:10], payload[10:])),
+            headers={
+                "Content-Type": "application/json",
+                "X-Hub-Signature-256": signature,
+                "X-GitHub-Event": "push",
+                "X-GitHub-Delivery": "test-delivery-id"
+            }
+        )
+        assert response.status_code == 413
+
     def test_valid_signature_returns_200(self):
         """Should return 200 when signature is valid."""
         payload = json.dumps({
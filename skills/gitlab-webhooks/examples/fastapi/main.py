@@ -1,33 +1,201 @@
 # Generated with: gitlab-webhooks skill
 # https://github.com/hookdeck/webhook-skills
 
-from fastapi import FastAPI, Request, Header, HTTPException
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
-import secrets
+import hmac
+import hashlib
 import os
 import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
 # Create FastAPI app
-app = FastAPI(title="GitLab Webhook Handler")
+app = FastAPI(title="GitLab Webhook Handler", lifespan=lifespan)
+
+# Read the expected token once at startup instead of on every request
+gitlab_token = (os.environ.get("GITLAB_WEBHOOK_TOKEN") or "").encode()
+
+# The token never changes, so hash it once here rather than per request;
+# None when no token is configured
+GITLAB_TOKEN_DIGEST = hashlib.sha256(gitlab_token).digest() if gitlab_token else None
+
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 5 * 1024 * 1024
+
 
 # GitLab token verification
-def verify_gitlab_webhook(token_header: Optional[str], secret: Optional[str]) -> bool:
-    """Verify GitLab webhook token using timing-safe comparison"""
-    if not token_header or not secret:
+def verify_gitlab_webhook(token_header: Optional[str], secret_digest: Optional[bytes]) -> bool:
+    """Verify GitLab webhook token against the SHA-256 digest of the secret"""
+    if not token_header or not secret_digest:
         return False
 
-    # GitLab uses simple token comparison (not HMAC)
-    # Use timing-safe comparison to prevent timing attacks
-    return secrets.compare_digest(token_header, secret)
+    # GitLab uses simple token comparison (not HMAC). Compare SHA-256
+    # digests of both tokens in constant time, so neither the token bytes
+    # nor the secret's length leak through response timing
+    return hmac.compare_digest(
+        hashlib.sha256(token_header.encode()).digest(),
+        secret_digest
+    )
+
+
+async def read_body(request: Request) -> bytes:
+    """Read the request body, enforcing MAX_BODY_SIZE as chunks arrive."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        # Content-Length can be absent (chunked encoding), so count as we go
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def handle_push(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    ref = payload.get("ref", "")
+    branch = ref.removeprefix("refs/heads/")
+    before = payload.get("before", "")[:8]
+    after = payload.get("after", "")[:8]
+    total_commits = payload.get("total_commits_count", 0)
+    logger.info("📤 Push to %s by %s:", branch, user_name)
+    logger.info("   %s commits (%s...%s)", total_commits, before, after)
+
+
+def handle_tag_push(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    ref = payload.get("ref", "")
+    tag = ref.removeprefix("refs/tags/")
+    before = payload.get("before", "")
+    if before == "0000000000000000000000000000000000000000":
+        logger.info("🏷️  New tag created: %s by %s", tag, user_name)
+    else:
+        logger.info("🏷️  Tag deleted: %s by %s", tag, user_name)
+
+
+def handle_merge_request(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    attrs = payload.get("object_attributes", {})
+    iid = attrs.get("iid")
+    title = attrs.get("title")
+    state = attrs.get("state")
+    action = attrs.get("action")
+    source_branch = attrs.get("source_branch")
+    target_branch = attrs.get("target_branch")
+    logger.info("🔀 Merge Request !%s %s: %s", iid, action, title)
+    logger.info("   %s → %s (%s)", source_branch, target_branch, state)
+
+
+def handle_issue(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    attrs = payload.get("object_attributes", {})
+    iid = attrs.get("iid")
+    title = attrs.get("title")
+    state = attrs.get("state")
+    action = attrs.get("action")
+    logger.info("📋 Issue #%s %s: %s", iid, action, title)
+    logger.info("   State: %s", state)
+
+
+def handle_note(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    attrs = payload.get("object_attributes", {})
+    note = attrs.get("note", "")[:50]
+    merge_request = payload.get("merge_request")
+    issue = payload.get("issue")
+    commit = payload.get("commit")
+
+    if merge_request:
+        logger.info("💬 Comment on MR !%s by %s", merge_request.get('iid'), user_name)
+    elif issue:
+        logger.info("💬 Comment on Issue #%s by %s", issue.get('iid'), user_name)
+    elif commit:
+        logger.info("💬 Comment on commit %s by %s", commit.get('id', '')[:8], user_name)
+    logger.info("   \"%s%s\"", note, '...' if len(attrs.get('note', '')) > 50 else '')
+
+
+def handle_pipeline(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    attrs = payload.get("object_attributes", {})
+    id = attrs.get("id")
+    ref = attrs.get("ref")
+    status = attrs.get("status")
+    duration = attrs.get("duration")
+    logger.info("🔄 Pipeline #%s %s for %s", id, status, ref)
+    if duration:
+        logger.info("   Duration: %ss", duration)
+
+
+def handle_build(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    build_name = payload.get("build_name")
+    build_stage = payload.get("build_stage")
+    build_status = payload.get("build_status")
+    build_duration = payload.get("build_duration")
+    logger.info("🔨 Job \"%s\" %s in stage %s", build_name, build_status, build_stage)
+    if build_duration:
+        logger.info("   Duration: %ss", build_duration)
+
+
+def handle_wiki_page(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    attrs = payload.get("object_attributes", {})
+    title = attrs.get("title")
+    action = attrs.get("action")
+    slug = attrs.get("slug")
+    logger.info("📖 Wiki page %s: %s", action, title)
+    logger.info("   Slug: %s", slug)
+
+
+def handle_deployment(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    status = payload.get("status")
+    environment = payload.get("environment")
+    deployable_url = payload.get("deployable_url")
+    logger.info("🚀 Deployment to %s: %s", environment, status)
+    if deployable_url:
+        logger.info("   URL: %s", deployable_url)
+
+
+def handle_release(payload: Dict[str, Any], user_name: Optional[str]) -> None:
+    action = payload.get("action")
+    name = payload.get("name")
+    tag = payload.get("tag")
+    description = payload.get("description", "")
+    logger.info("📦 Release %s: %s (%s)", action, name, tag)
+    if description:
+        desc_preview = description[:100]
+        logger.info("   %s%s", desc_preview, '...' if len(description) > 100 else '')
+
+
+# Map object kinds to their handlers
+EVENT_HANDLERS = {
+    "push": handle_push,
+    "tag_push": handle_tag_push,
+    "merge_request": handle_merge_request,
+    "issue": handle_issue,
+    "work_item": handle_issue,
+    "note": handle_note,
+    "pipeline": handle_pipeline,
+    "build": handle_build,  # Job events
+    "wiki_page": handle_wiki_page,
+    "deployment": handle_deployment,
+    "release": handle_release,
+}
 
 
 # Health check endpoint
@@ -38,28 +206,40 @@ async def health():
 
 # GitLab webhook endpoint
 @app.post("/webhooks/gitlab")
-async def handle_gitlab_webhook(
-    request: Request,
-    x_gitlab_token: Optional[str] = Header(None),
-    x_gitlab_event: Optional[str] = Header(None),
-    x_gitlab_instance: Optional[str] = Header(None),
-    x_gitlab_webhook_uuid: Optional[str] = Header(None),
-    x_gitlab_event_uuid: Optional[str] = Header(None),
-):
+async def handle_gitlab_webhook(request: Request):
+    # Read headers straight from the request rather than declaring Header()
+    # parameters, which FastAPI would validate on every request
+    headers = request.headers
+    x_gitlab_token = headers.get("x-gitlab-token")
+    x_gitlab_event = headers.get("x-gitlab-event")
+    x_gitlab_instance = headers.get("x-gitlab-instance")
+    x_gitlab_webhook_uuid = headers.get("x-gitlab-webhook-uuid")
+    x_gitlab_event_uuid = headers.get("x-gitlab-event-uuid")
+
+    # Reject oversized bodies from the Content-Length header before reading
+    # or hashing anything
+    content_length = headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
     # Verify token
-    if not verify_gitlab_webhook(x_gitlab_token, os.getenv("GITLAB_WEBHOOK_TOKEN")):
-        logger.error(f"GitLab webhook verification failed from {x_gitlab_instance}")
+    if not verify_gitlab_webhook(x_gitlab_token, GITLAB_TOKEN_DIGEST):
+        logger.error("GitLab webhook verification failed from %s", x_gitlab_instance)
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    logger.info(f"✓ Verified GitLab webhook from {x_gitlab_instance}")
-    logger.info(f"  Event: {x_gitlab_event} (UUID: {x_gitlab_event_uuid})")
-    logger.info(f"  Webhook UUID: {x_gitlab_webhook_uuid}")
+    logger.info("✓ Verified GitLab webhook from %s", x_gitlab_instance)
+    logger.info("  Event: %s (UUID: %s)", x_gitlab_event, x_gitlab_event_uuid)
+    logger.info("  Webhook UUID: %s", x_gitlab_webhook_uuid)
+
+    # Read the body outside the JSON error handling so a 413 is not
+    # reported as invalid JSON
+    body = await read_body(request)
 
     # Parse JSON body
     try:
-        payload = await request.json()
+        payload = orjson.loads(body)
     except Exception as e:
-        logger.error(f"Failed to parse JSON: {e}")
+        logger.error("Failed to parse JSON: %s", e)
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
     # Extract common fields
@@ -68,107 +248,12 @@ async def handle_gitlab_webhook(
     user_name = payload.get("user_name")
 
     # Handle different event types
-    if object_kind == "push":
-        ref = payload.get("ref", "")
-        branch = ref.replace("refs/heads/", "")
-        before = payload.get("before", "")[:8]
-        after = payload.get("after", "")[:8]
-        total_commits = payload.get("total_commits_count", 0)
-        logger.info(f"📤 Push to {branch} by {user_name}:")
-        logger.info(f"   {total_commits} commits ({before}...{after})")
-
-    elif object_kind == "tag_push":
-        ref = payload.get("ref", "")
-        tag = ref.replace("refs/tags/", "")
-        before = payload.get("before", "")
-        if before == "0000000000000000000000000000000000000000":
-            logger.info(f"🏷️  New tag created: {tag} by {user_name}")
-        else:
-            logger.info(f"🏷️  Tag deleted: {tag} by {user_name}")
-
-    elif object_kind == "merge_request":
-        attrs = payload.get("object_attributes", {})
-        iid = attrs.get("iid")
-        title = attrs.get("title")
-        state = attrs.get("state")
-        action = attrs.get("action")
-        source_branch = attrs.get("source_branch")
-        target_branch = attrs.get("target_branch")
-        logger.info(f"🔀 Merge Request !{iid} {action}: {title}")
-        logger.info(f"   {source_branch} → {target_branch} ({state})")
-
-    elif object_kind in ["issue", "work_item"]:
-        attrs = payload.get("object_attributes", {})
-        iid = attrs.get("iid")
-        title = attrs.get("title")
-        state = attrs.get("state")
-        action = attrs.get("action")
-        logger.info(f"📋 Issue #{iid} {action}: {title}")
-        logger.info(f"   State: {state}")
-
-    elif object_kind == "note":
-        attrs = payload.get("object_attributes", {})
-        note = attrs.get("note", "")[:50]
-        merge_request = payload.get("merge_request")
-        issue = payload.get("issue")
-        commit = payload.get("commit")
-
-        if merge_request:
-            logger.info(f"💬 Comment on MR !{merge_request.get('iid')} by {user_name}")
-        elif issue:
-            logger.info(f"💬 Comment on Issue #{issue.get('iid')} by {user_name}")
-        elif commit:
-            logger.info(f"💬 Comment on commit {commit.get('id', '')[:8]} by {user_name}")
-        logger.info(f"   \"{note}{'...' if len(attrs.get('note', '')) > 50 else ''}\"")
-
-    elif object_kind == "pipeline":
-        attrs = payload.get("object_attributes", {})
-        id = attrs.get("id")
-        ref = attrs.get("ref")
-        status = attrs.get("status")
-        duration = attrs.get("duration")
-        logger.info(f"🔄 Pipeline #{id} {status} for {ref}")
-        if duration:
-            logger.info(f"   Duration: {duration}s")
-
-    elif object_kind == "build":  # Job events
-        build_name = payload.get("build_name")
-        build_stage = payload.get("build_stage")
-        build_status = payload.get("build_status")
-        build_duration = payload.get("build_duration")
-        logger.info(f"🔨 Job \"{build_name}\" {build_status} in stage {build_stage}")
-        if build_duration:
-            logger.info(f"   Duration: {build_duration}s")
-
-    elif object_kind == "wiki_page":
-        attrs = payload.get("object_attributes", {})
-        title = attrs.get("title")
-        action = attrs.get("action")
-        slug = attrs.get("slug")
-        logger.info(f"📖 Wiki page {action}: {title}")
-        logger.info(f"   Slug: {slug}")
-
-    elif object_kind == "deployment":
-        status = payload.get("status")
-        environment = payload.get("environment")
-        deployable_url = payload.get("deployable_url")
-        logger.info(f"🚀 Deployment to {environment}: {status}")
-        if deployable_url:
-            logger.info(f"   URL: {deployable_url}")
-
-    elif object_kind == "release":
-        action = payload.get("action")
-        name = payload.get("name")
-        tag = payload.get("tag")
-        description = payload.get("description", "")
-        logger.info(f"📦 Release {action}: {name} ({tag})")
-        if description:
-            desc_preview = description[:100]
-            logger.info(f"   {desc_preview}{'...' if len(description) > 100 else ''}")
-
+    handler = EVENT_HANDLERS.get(object_kind)
+    if handler:
+        handler(payload, user_name)
     else:
-        logger.info(f"❓ Received {object_kind or x_gitlab_event} event")
-        logger.info(f"   Project: {project.get('name')} ({project.get('path_with_namespace')})")
+        logger.info("❓ Received %s event", object_kind or x_gitlab_event)
+        logger.info("   Project: %s (%s)", project.get('name'), project.get('path_with_namespace'))
 
     # Return success response
     return JSONResponse(content={
@@ -192,10 +277,19 @@ if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 3000))
 
-    logger.info(f"GitLab webhook server starting on port {port}")
-    logger.info(f"Webhook endpoint: POST http://localhost:{port}/webhooks/gitlab")
+    logger.info("GitLab webhook server starting on port %s", port)
+    logger.info("Webhook endpoint: POST http://localhost:%s/webhooks/gitlab", port)
 
-    if not os.getenv("GITLAB_WEBHOOK_TOKEN"):
+    if not gitlab_token:
         logger.warning("⚠️  Warning: GITLAB_WEBHOOK_TOKEN not set")
 
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning"
+    )
\ No newline at end of file
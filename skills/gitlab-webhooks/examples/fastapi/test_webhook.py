@@ -8,16 +8,21 @@ os.environ["GITLAB_WEBHOOK_TOKEN"] = TEST_TOKEN
 
 from main import app
 
-client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def client():
+    """One client for the module, so the app lifespan runs only once."""
+    with TestClient(app) as c:
+        yield c
 
 
 class TestGitLabWebhookHandler:
-    def test_health_check(self):
+    def test_health_check(self, client):
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
 
-    def test_webhook_without_token(self):
+    def test_webhook_without_token(self, client):
         response = client.post(
             "/webhooks/gitlab",
             json={"object_kind": "push"}
@@ -25,7 +30,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 401
         assert response.json() == {"error": "Unauthorized"}
 
-    def test_webhook_with_invalid_token(self):
+    def test_webhook_with_invalid_token(self, client):
         response = client.post(
             "/webhooks/gitlab",
             headers={"X-Gitlab-Token": "invalid_token"},
@@ -34,7 +39,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 401
         assert response.json() == {"error": "Unauthorized"}
 
-    def test_webhook_with_valid_token(self):
+    def test_webhook_with_valid_token(self, client):
         response = client.post(
             "/webhooks/gitlab",
             headers={
@@ -56,7 +61,7 @@ class TestGitLabWebhookHandler:
             "project": "namespace/test-project"
         }
 
-    def test_push_event(self):
+    def test_push_event(self, client):
         payload = {
             "object_kind": "push",
             "ref": "refs/heads/main",
@@ -83,7 +88,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "push"
 
-    def test_tag_push_event(self):
+    def test_tag_push_event(self, client):
         payload = {
             "object_kind": "tag_push",
             "ref": "refs/tags/v1.0.0",
@@ -107,7 +112,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "tag_push"
 
-    def test_merge_request_event(self):
+    def test_merge_request_event(self, client):
         payload = {
             "object_kind": "merge_request",
             "user_name": "John Doe",
@@ -136,7 +141,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "merge_request"
 
-    def test_issue_event(self):
+    def test_issue_event(self, client):
         payload = {
             "object_kind": "issue",
             "user_name": "Jane Doe",
@@ -163,7 +168,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "issue"
 
-    def test_work_item_event(self):
+    def test_work_item_event(self, client):
         payload = {
             "object_kind": "work_item",
             "user_name": "Jane Doe",
@@ -190,7 +195,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "work_item"
 
-    def test_pipeline_event(self):
+    def test_pipeline_event(self, client):
         payload = {
             "object_kind": "pipeline",
             "object_attributes": {
@@ -217,7 +222,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "pipeline"
 
-    def test_job_event(self):
+    def test_job_event(self, client):
         payload = {
             "object_kind": "build",
             "build_name": "test-job",
@@ -238,7 +243,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "build"
 
-    def test_note_event(self):
+    def test_note_event(self, client):
         payload = {
             "object_kind": "note",
             "user_name": "John Doe",
@@ -266,7 +271,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "note"
 
-    def test_wiki_page_event(self):
+    def test_wiki_page_event(self, client):
         payload = {
             "object_kind": "wiki_page",
             "object_attributes": {
@@ -291,7 +296,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "wiki_page"
 
-    def test_deployment_event(self):
+    def test_deployment_event(self, client):
         payload = {
             "object_kind": "deployment",
             "status": "success",
@@ -314,7 +319,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "deployment"
 
-    def test_release_event(self):
+    def test_release_event(self, client):
         payload = {
             "object_kind": "release",
             "action": "create",
@@ -338,7 +343,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "release"
 
-    def test_unknown_event(self):
+    def test_unknown_event(self, client):
         payload = {
             "object_kind": "unknown_event",
             "project": {
@@ -358,7 +363,7 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["event"] == "unknown_event"
 
-    def test_large_payload(self):
+    def test_large_payload(self, client):
         # Create a payload with many commits
         commits = [
             {
@@ -394,7 +399,35 @@ class TestGitLabWebhookHandler:
         assert response.status_code == 200
         assert response.json()["received"] == True
 
-    def test_invalid_json(self):
+    def test_oversized_payload(self, client, monkeypatch):
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        response = client.post(
+            "/webhooks/gitlab",
+            headers={
+                "X-Gitlab-Token": TEST_TOKEN,
+                "X-Gitlab-Event": "Push Hook"
+            },
+            json={"object_kind": "push", "project": {"name": "Test Project"}}
+        )
+        assert response.status_code == 413
+
+    def test_oversized_chunked_payload(self, client, monkeypatch):
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        payload = b'{"object_kind": "push", "project": {"name": "Test Project"}}'
+
+        # A generator body is sent chunked, without a Content-Length header
+        response = client.post(
+            "/webhooks/gitlab",
+            headers={
+                "X-Gitlab-Token": TEST_TOKEN,
+                "X-Gitlab-Event": "Push Hook",
+                "Content-Type": "application/json"
+            },
+            content=(chunk for chunk in (payload[:10], payload[10:]))
+        )
+        assert response.status_code == 413
+
+    def test_invalid_json(self, client):
         response = client.post(
             "/webhooks/gitlab",
             headers={
@@ -405,7 +438,7 @@ class TestGitLabWebhookHandler:
         )
         assert response.status_code == 400  # Bad Request for invalid JSON
 
-    def test_timing_safe_comparison(self):
+    def test_timing_safe_comparison(self, client):
         # Test with different length token
         response = client.post(
             "/webhooks/gitlab",
@@ -2,77 +2,195 @@ import os
 import hmac
 import hashlib
 import base64
-import json
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import msgspec
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Depends, Response
 
 load_dotenv()
 
-app = FastAPI()
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 hookdeck_secret = os.environ.get("HOOKDECK_WEBHOOK_SECRET")
 
+# HMAC keyed with the secret at startup; requests work on a copy of it, so
+# the secret is encoded and padded into the key blocks only once. It stays
+# None without a secret, so nothing is ever checked against an empty key.
+HOOKDECK_HMAC = (
+    hmac.new(hookdeck_secret.encode("utf-8"), digestmod=hashlib.sha256)
+    if hookdeck_secret else None
+)
+
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 5 * 1024 * 1024
 
-def verify_hookdeck_signature(raw_body: bytes, signature: str, secret: str) -> bool:
-    """Verify Hookdeck webhook signature."""
-    if not signature or not secret:
+
+def signature_matches(signature: Optional[str], digest: bytes) -> bool:
+    """Check an x-hookdeck-signature header against an HMAC-SHA256 digest."""
+    if not signature:
         return False
 
-    computed = base64.b64encode(
-        hmac.new(
-            secret.encode('utf-8'),
-            raw_body,
-            hashlib.sha256
-        ).digest()
-    ).decode('utf-8')
+    # Compare the base64 digest as bytes, with no round trip through str
+    return hmac.compare_digest(base64.b64encode(digest), signature.encode("utf-8"))
 
-    return hmac.compare_digest(computed, signature)
 
+def verify_hookdeck_signature(
+    raw_body: bytes,
+    signature: Optional[str],
+    mac_template: Optional[hmac.HMAC]
+) -> bool:
+    """Verify Hookdeck webhook signature using a pre-keyed HMAC-SHA256."""
+    if mac_template is None:
+        return False
+
+    mac = mac_template.copy()
+    mac.update(raw_body)
+    return signature_matches(signature, mac.digest())
+
+
+async def read_and_hash(request: Request, hasher) -> bytes:
+    """Read the request body, feeding each chunk to `hasher` as it arrives."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        # Content-Length can be absent (chunked encoding), so count as we go
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        hasher.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class EventData(msgspec.Struct):
+    """The data envelope of a Stripe-style event."""
+    object: Dict[str, Any] = {}
+
+
+class HookdeckEvent(msgspec.Struct):
+    """The fields of a forwarded payload used for routing; others are skipped."""
+    type: Optional[str] = None
+    topic: Optional[str] = None
+    data: Optional[EventData] = None
+
+
+def handle_payment_intent_succeeded(data_object: Dict[str, Any]) -> None:
+    logger.info("Payment succeeded: %s", data_object.get('id'))
+
+
+def handle_subscription_created(data_object: Dict[str, Any]) -> None:
+    logger.info("Subscription created: %s", data_object.get('id'))
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "payment_intent.succeeded": handle_payment_intent_succeeded,
+    "customer.subscription.created": handle_subscription_created,
+}
+
+# Fixed replies are encoded once at import; only acknowledgements that
+# echo an event id are serialized per request
+HEALTH_RESPONSE = Response(content=b'{"status":"ok"}', media_type="application/json")
+NO_EVENT_ID_RESPONSE = Response(content=b'{"received":true,"eventId":null}', media_type="application/json")
+
+
+# Dependency that reads the body once, verifies it and hands the route the
+# parsed payload
+async def verified_event(request: Request) -> HookdeckEvent:
+    """Return the webhook payload once its Hookdeck signature checks out."""
+    # Reject oversized bodies from the Content-Length header before reading
+    # or hashing anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Payload too large")
 
-@app.post("/webhooks")
-async def webhook(request: Request):
-    # Get the raw body for signature verification
-    raw_body = await request.body()
     signature = request.headers.get("x-hookdeck-signature")
-    event_id = request.headers.get("x-hookdeck-event-id")
-    source_id = request.headers.get("x-hookdeck-source-id")
-    attempt_number = request.headers.get("x-hookdeck-attempt-number")
+    if HOOKDECK_HMAC is None or not signature:
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    # Hash the body chunk by chunk as it arrives, keeping the raw bytes
+    # for parsing once the signature is verified
+    mac = HOOKDECK_HMAC.copy()
+    raw_body = await read_and_hash(request, mac)
 
     # Verify Hookdeck signature
-    if not verify_hookdeck_signature(raw_body, signature, hookdeck_secret):
+    if not signature_matches(signature, mac.digest()):
         raise HTTPException(status_code=401, detail="Invalid signature")
 
-    # Parse the payload after verification
-    payload = json.loads(raw_body)
+    # Decode the payload after verification. Hookdeck relays payloads from
+    # any provider, so a signed body whose fields do not match the routing
+    # fields is still acknowledged as a generic event rather than retried.
+    try:
+        return msgspec.json.decode(raw_body, type=HookdeckEvent)
+    except msgspec.ValidationError:
+        return HookdeckEvent()
+    except msgspec.DecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
 
-    print(f"Received event {event_id} from source {source_id} (attempt {attempt_number})")
 
-    # Handle based on the original event type
-    event_type = payload.get("type") or payload.get("topic") or "unknown"
-    print(f"Event type: {event_type}")
+@app.post("/webhooks")
+async def webhook(request: Request, event: HookdeckEvent = Depends(verified_event)):
+    event_id = request.headers.get("x-hookdeck-event-id")
+    source_id = request.headers.get("x-hookdeck-source-id")
+    attempt_number = request.headers.get("x-hookdeck-attempt-number")
 
-    # Example: Handle Stripe events
-    if "type" in payload:
-        if payload["type"] == "payment_intent.succeeded":
-            data_object = payload.get("data", {}).get("object", {})
-            print(f"Payment succeeded: {data_object.get('id')}")
+    logger.info("Received event %s from source %s (attempt %s)", event_id, source_id, attempt_number)
 
-        elif payload["type"] == "customer.subscription.created":
-            data_object = payload.get("data", {}).get("object", {})
-            print(f"Subscription created: {data_object.get('id')}")
+    # Handle based on the original event type
+    event_type = event.type or event.topic or "unknown"
+    logger.info("Event type: %s", event_type)
 
+    # Example: Handle Stripe events
+    if event.type is not None:
+        handler = EVENT_HANDLERS.get(event.type)
+        if handler:
+            handler(event.data.object if event.data is not None else {})
         else:
-            print(f"Received event: {payload['type']}")
+            logger.info("Received event: %s", event.type)
 
     # Return 200 to acknowledge receipt
-    return {"received": True, "eventId": event_id}
+    if event_id is None:
+        return NO_EVENT_ID_RESPONSE
+    return Response(
+        content=msgspec.json.encode({"received": True, "eventId": event_id}),
+        media_type="application/json"
+    )
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return HEALTH_RESPONSE
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt).
+    # Multiple workers need the app as an import string.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=3000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count()
+    )
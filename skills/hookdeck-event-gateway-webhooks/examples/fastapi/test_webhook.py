@@ -11,9 +11,6 @@ os.environ["HOOKDECK_WEBHOOK_SECRET"] = "test_hookdeck_secret"
 
 from main import app, verify_hookdeck_signature
 
-client = TestClient(app)
-
-
 def generate_hookdeck_signature(payload: str, secret: str) -> str:
     """Generate a valid Hookdeck signature for testing (base64 HMAC SHA-256)."""
     return base64.b64encode(
@@ -25,31 +22,76 @@ def generate_hookdeck_signature(payload: str, secret: str) -> str:
     ).decode("utf-8")
 
 
+@pytest.fixture(scope="module")
+def client():
+    """One client for the module, so the app lifespan runs only once."""
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def signed():
+    """Request bodies and their signatures, signed once for the module."""
+    secret = os.environ["HOOKDECK_WEBHOOK_SECRET"]
+    payloads = {
+        "payment": json.dumps({
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": "pi_123"}}
+        }),
+        "subscription": json.dumps({
+            "type": "customer.subscription.created",
+            "data": {"object": {"id": "sub_123"}}
+        }),
+        "shopify": json.dumps({
+            "id": 123456,
+            "email": "test@example.com"
+        }),
+    }
+    return {
+        name: (payload, generate_hookdeck_signature(payload, secret))
+        for name, payload in payloads.items()
+    }
+
+
 class TestVerifyHookdeckSignature:
     """Tests for Hookdeck signature verification function."""
     
     secret = os.environ["HOOKDECK_WEBHOOK_SECRET"]
+    mac = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
 
     def test_valid_signature_returns_true(self):
         """Should return True for valid signature."""
         payload = b'{"type":"test"}'
         signature = generate_hookdeck_signature(payload.decode(), self.secret)
         
-        assert verify_hookdeck_signature(payload, signature, self.secret) is True
+        assert verify_hookdeck_signature(payload, signature, self.mac) is True
 
     def test_invalid_signature_returns_false(self):
         """Should return False for invalid signature."""
         payload = b'{"type":"test"}'
         
-        assert verify_hookdeck_signature(payload, "invalid_signature", self.secret) is False
+        assert verify_hookdeck_signature(payload, "invalid_signature", self.mac) is False
+
+    def test_template_is_reusable(self):
+        """Should leave the keyed template untouched between verifications."""
+        payload = b'{"type":"test"}'
+        signature = generate_hookdeck_signature(payload.decode(), self.secret)
+
+        assert verify_hookdeck_signature(b'{"type":"other"}', signature, self.mac) is False
+        assert verify_hookdeck_signature(payload, signature, self.mac) is True
+
+    def test_missing_key_returns_false(self):
+        """Should return False when no secret is configured."""
+        payload = b'{"type":"test"}'
+        signature = generate_hookdeck_signature(payload.decode(), "")
+
+        assert verify_hookdeck_signature(payload, signature, None) is False
 
 
 class TestHookdeckWebhook:
     """Tests for Hookdeck webhook endpoint."""
-    
-    secret = os.environ["HOOKDECK_WEBHOOK_SECRET"]
 
-    def test_missing_signature_returns_401(self):
+    def test_missing_signature_returns_401(self, client):
         """Should return 401 when signature header is missing."""
         response = client.post(
             "/webhooks",
@@ -63,7 +105,7 @@ class TestHookdeckWebhook:
         assert response.status_code == 401
         assert "Invalid signature" in response.json()["detail"]
 
-    def test_invalid_signature_returns_401(self):
+    def test_invalid_signature_returns_401(self, client):
         """Should return 401 when signature is invalid."""
         payload = json.dumps({"type": "payment_intent.succeeded"})
         
@@ -79,13 +121,62 @@ class TestHookdeckWebhook:
         )
         assert response.status_code == 401
 
-    def test_valid_signature_returns_200(self):
+    def test_unconfigured_secret_returns_401(self, client, monkeypatch):
+        """Should return 401 when no secret is configured."""
+        monkeypatch.setattr("main.HOOKDECK_HMAC", None)
+        payload = '{"type":"test"}'
+        signature = generate_hookdeck_signature(payload, "")
+
+        response = client.post(
+            "/webhooks",
+            content=payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Hookdeck-Signature": signature,
+                "X-Hookdeck-Event-Id": "evt_123",
+                "X-Hookdeck-Source-Id": "src_123"
+            }
+        )
+        assert response.status_code == 401
+
+    def test_oversized_body_returns_413(self, client, signed, monkeypatch):
+        """Should return 413 when a chunked body grows past the size limit."""
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        payload, signature = signed["payment"]
+
+        # A generator body is sent chunked, without a Content-Length header
+        response = client.post(
+            "/webhooks",
+            content=(chunk.encode() for chunk in (payload[:10], payload[10:])),
+            headers={
+                "Content-Type": "application/json",
+                "X-Hookdeck-Signature": signature,
+                "X-Hookdeck-Event-Id": "evt_123",
+                "X-Hookdeck-Source-Id": "src_123"
+            }
+        )
+        assert response.status_code == 413
+
+    def test_invalid_json_returns_400(self, client):
+        """Should return 400 when a correctly signed body is not JSON."""
+        payload = "not json"
+        signature = generate_hookdeck_signature(payload, os.environ["HOOKDECK_WEBHOOK_SECRET"])
+
+        response = client.post(
+            "/webhooks",
+            content=payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Hookdeck-Signature": signature,
+                "X-Hookdeck-Event-Id": "evt_123",
+                "X-Hookdeck-Source-Id": "src_123"
+            }
+        )
+        assert response.status_code == 400
+
+    def test_valid_signature_returns_200(self, client, signed):
         """Should return 200 when signature is valid."""
-        payload = json.dumps({
-            "type": "payment_intent.succeeded",
-            "data": {"object": {"id": "pi_123"}}
-        })
-        signature = generate_hookdeck_signature(payload, self.secret)
+        payload, signature = signed["payment"]
         
         response = client.post(
             "/webhooks",
@@ -102,13 +193,9 @@ class TestHookdeckWebhook:
         assert response.json()["received"] is True
         assert response.json()["eventId"] == "evt_123"
 
-    def test_handles_stripe_style_events(self):
+    def test_handles_stripe_style_events(self, client, signed):
         """Should handle Stripe-style events."""
-        payload = json.dumps({
-            "type": "customer.subscription.created",
-            "data": {"object": {"id": "sub_123"}}
-        })
-        signature = generate_hookdeck_signature(payload, self.secret)
+        payload, signature = signed["subscription"]
         
         response = client.post(
             "/webhooks",
@@ -122,13 +209,9 @@ class TestHookdeckWebhook:
         )
         assert response.status_code == 200
 
-    def test_handles_shopify_style_events(self):
+    def test_handles_shopify_style_events(self, client, signed):
         """Should handle Shopify-style events."""
-        payload = json.dumps({
-            "id": 123456,
-            "email": "test@example.com"
-        })
-        signature = generate_hookdeck_signature(payload, self.secret)
+        payload, signature = signed["shopify"]
         
         response = client.post(
             "/webhooks",
@@ -142,11 +225,36 @@ class TestHookdeckWebhook:
         )
         assert response.status_code == 200
 
+    @pytest.mark.parametrize("payload", [
+        '{"type":"foo","data":[1,2]}',
+        '{"type":"payment_intent.succeeded","data":[1,2]}',
+        '{"type":"payment_intent.succeeded","data":{"object":[1]}}',
+        '{"topic":{"a":1}}',
+        '{"type":5}',
+        '[1,2]',
+    ])
+    def test_unexpected_field_types_are_acknowledged(self, client, payload):
+        """Should acknowledge signed JSON payloads whatever their shape."""
+        signature = generate_hookdeck_signature(payload, os.environ["HOOKDECK_WEBHOOK_SECRET"])
+
+        response = client.post(
+            "/webhooks",
+            content=payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Hookdeck-Signature": signature,
+                "X-Hookdeck-Event-Id": "evt_123",
+                "X-Hookdeck-Source-Id": "src_123"
+            }
+        )
+        assert response.status_code == 200
+        assert response.json()["received"] is True
+
 
 class TestHealth:
     """Tests for health endpoint."""
     
-    def test_health_returns_ok(self):
+    def test_health_returns_ok(self, client):
         """Should return health status."""
         response = client.get("/health")
         assert response.status_code == 200
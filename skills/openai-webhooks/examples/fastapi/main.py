@@ -4,16 +4,117 @@
 import os
 import hmac
 import hashlib
-import json
 import base64
 import time
-from typing import Optional
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import msgspec
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException, Header, Response
 
 load_dotenv()
 
-app = FastAPI(title="OpenAI Webhook Handler")
+# Configure logging through a queue so request handlers never block on
+# console I/O; a background listener thread writes the records out
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    yield
+    log_listener.stop()
+
+
+app = FastAPI(title="OpenAI Webhook Handler", lifespan=lifespan)
+
+# Read the webhook secret once at startup instead of on every request
+webhook_secret = os.environ.get("OPENAI_WEBHOOK_SECRET")
+
+# Decode the signing key once (base64, with an optional "whsec_" prefix)
+signing_key = None
+if webhook_secret:
+    try:
+        signing_key = base64.b64decode(webhook_secret.removeprefix("whsec_"))
+    except ValueError:
+        logger.error("OPENAI_WEBHOOK_SECRET is not valid base64")
+
+# HMAC keyed with the signing key at startup; each request continues from a
+# copy, so the padded key blocks are only hashed once
+signing_hmac = hmac.new(signing_key, digestmod=hashlib.sha256) if signing_key is not None else None
+
+# Upper bounds on header lengths; anything longer is malformed and is
+# rejected before any parsing work is done on it
+MAX_TIMESTAMP_LENGTH = 16
+MAX_SIGNATURE_HEADER_LENGTH = 256
+
+# Reject request bodies larger than this (bytes)
+MAX_BODY_SIZE = 5 * 1024 * 1024
+
+
+def parse_openai_signature(
+    webhook_id: Optional[str],
+    webhook_timestamp: Optional[str],
+    webhook_signature: Optional[str]
+) -> Optional[bytes]:
+    """
+    Validate the Standard Webhooks headers before any hashing
+
+    Args:
+        webhook_id: Value of webhook-id header
+        webhook_timestamp: Value of webhook-timestamp header
+        webhook_signature: Value of webhook-signature header
+
+    Returns:
+        The v1 signature, or None if the headers are missing, malformed or stale
+    """
+    if not webhook_id or not webhook_timestamp or not webhook_signature:
+        return None
+
+    # Cheap length and format checks first, so oversized or non-numeric
+    # headers are rejected without parsing them
+    if len(webhook_timestamp) > MAX_TIMESTAMP_LENGTH or len(webhook_signature) > MAX_SIGNATURE_HEADER_LENGTH:
+        return None
+    if not (webhook_timestamp.isascii() and webhook_timestamp.isdigit()):
+        return None
+
+    # Check timestamp is within 5 minutes to prevent replay attacks
+    timestamp_diff = int(time.time()) - int(webhook_timestamp)
+    if timestamp_diff > 300 or timestamp_diff < -300:
+        logger.warning("Webhook timestamp too old or too far in the future: %ss difference", timestamp_diff)
+        return None
+
+    # Extract version and signature in a single pass over the header
+    version, separator, signature = webhook_signature.partition(',')
+    if not separator or version != 'v1':
+        return None
+
+    return signature.encode()
+
+
+def openai_signing_hmac(mac_template, webhook_id: str, webhook_timestamp: str):
+    """
+    Start the HMAC over "{webhook_id}.{webhook_timestamp}.{payload}" from a
+    copy of the keyed template; the caller feeds in the payload, so it is
+    hashed in place rather than decoded, concatenated and re-encoded
+    """
+    mac = mac_template.copy()
+    mac.update(webhook_id.encode())
+    mac.update(b".")
+    mac.update(webhook_timestamp.encode())
+    mac.update(b".")
+    return mac
+
+
+def signature_matches(signature: bytes, mac) -> bool:
+    """Timing-safe comparison of a v1 signature with the finished HMAC"""
+    return hmac.compare_digest(signature, base64.b64encode(mac.digest()))
 
 
 def verify_openai_signature(
@@ -21,7 +122,7 @@ def verify_openai_signature(
     webhook_id: Optional[str],
     webhook_timestamp: Optional[str],
     webhook_signature: Optional[str],
-    secret: str
+    mac_template
 ) -> bool:
     """
     Verify OpenAI webhook signature using Standard Webhooks
@@ -31,54 +132,100 @@ def verify_openai_signature(
         webhook_id: Value of webhook-id header
         webhook_timestamp: Value of webhook-timestamp header
         webhook_signature: Value of webhook-signature header
-        secret: Webhook signing secret
+        mac_template: HMAC-SHA256 keyed with the decoded signing key
 
     Returns:
         Whether signature is valid
     """
-    if not webhook_id or not webhook_timestamp or not webhook_signature or ',' not in webhook_signature:
+    signature = parse_openai_signature(webhook_id, webhook_timestamp, webhook_signature)
+    if signature is None:
         return False
 
-    # Check timestamp is within 5 minutes to prevent replay attacks
-    current_time = int(time.time())
-    try:
-        timestamp_diff = current_time - int(webhook_timestamp)
-        if timestamp_diff > 300 or timestamp_diff < -300:
-            print(f"Webhook timestamp too old or too far in the future: {timestamp_diff}s difference")
-            return False
-    except ValueError:
-        return False
+    mac = openai_signing_hmac(mac_template, webhook_id, webhook_timestamp)
+    mac.update(payload)
+    return signature_matches(signature, mac)
 
-    # Extract version and signature
-    parts = webhook_signature.split(',', 1)
-    if len(parts) != 2:
-        return False
 
-    version, signature = parts
-    if version != 'v1':
-        return False
+async def read_and_hash(request: Request, hasher) -> bytes:
+    """Read the request body, feeding each chunk to `hasher` as it arrives."""
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        # Content-Length can be absent (chunked encoding), so count as we go
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        hasher.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks)
 
-    # Create signed content
-    signed_content = f"{webhook_id}.{webhook_timestamp}.{payload.decode('utf-8')}"
 
-    # Decode base64 secret (remove whsec_ prefix if present)
-    secret_key = secret[6:] if secret.startswith('whsec_') else secret
-    try:
-        secret_bytes = base64.b64decode(secret_key)
-    except Exception:
-        return False
+class OpenAIEvent(msgspec.Struct):
+    """Top-level envelope of an OpenAI webhook; only type and data are decoded."""
+    type: Optional[str] = None
+    data: Dict[str, Any] = {}
+
+
+def handle_fine_tuning_job_succeeded(data: Dict[str, Any]) -> None:
+    logger.info("Fine-tuning job succeeded: %s", data.get('id'))
+    logger.info("Fine-tuned model: %s", data.get('fine_tuned_model'))
+    # TODO: Deploy model, notify team, update database
+
+
+def handle_fine_tuning_job_failed(data: Dict[str, Any]) -> None:
+    logger.info("Fine-tuning job failed: %s", data.get('id'))
+    error = data.get('error', {})
+    logger.info("Error: %s", error.get('message'))
+    # TODO: Alert team, log error, retry if appropriate
+
+
+def handle_fine_tuning_job_cancelled(data: Dict[str, Any]) -> None:
+    logger.info("Fine-tuning job cancelled: %s", data.get('id'))
+    # TODO: Clean up resources, update status
 
-    # Generate expected signature
-    expected_signature = base64.b64encode(
-        hmac.new(
-            secret_bytes,
-            signed_content.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
-    ).decode('utf-8')
 
-    # Timing-safe comparison to prevent timing attacks
-    return hmac.compare_digest(signature, expected_signature)
+def handle_batch_completed(data: Dict[str, Any]) -> None:
+    logger.info("Batch completed: %s", data.get('id'))
+    logger.info("Output file: %s", data.get('output_file_id'))
+    # TODO: Download results, process output, trigger next steps
+
+
+def handle_batch_failed(data: Dict[str, Any]) -> None:
+    logger.info("Batch failed: %s", data.get('id'))
+    logger.info("Error: %s", data.get('errors'))
+    # TODO: Handle errors, retry failed items
+
+
+def handle_batch_cancelled(data: Dict[str, Any]) -> None:
+    logger.info("Batch cancelled: %s", data.get('id'))
+    # TODO: Clean up resources, update status
+
+
+def handle_batch_expired(data: Dict[str, Any]) -> None:
+    logger.info("Batch expired: %s", data.get('id'))
+    # TODO: Clean up resources, handle timeout
+
+
+def handle_realtime_call_incoming(data: Dict[str, Any]) -> None:
+    logger.info("Realtime call incoming: %s", data.get('id'))
+    # TODO: Handle incoming call, connect client
+
+
+# Map event types to their handlers
+EVENT_HANDLERS = {
+    "fine_tuning.job.succeeded": handle_fine_tuning_job_succeeded,
+    "fine_tuning.job.failed": handle_fine_tuning_job_failed,
+    "fine_tuning.job.cancelled": handle_fine_tuning_job_cancelled,
+    "batch.completed": handle_batch_completed,
+    "batch.failed": handle_batch_failed,
+    "batch.cancelled": handle_batch_cancelled,
+    "batch.expired": handle_batch_expired,
+    "realtime.call.incoming": handle_realtime_call_incoming,
+}
+
+# Neither reply depends on the request, so both are serialized once here
+HEALTH_RESPONSE = Response(content=b'{"status":"ok"}', media_type="application/json")
+RECEIVED_RESPONSE = Response(content=b'{"received":true}', media_type="application/json")
 
 
 @app.post("/webhooks/openai")
@@ -91,72 +238,50 @@ async def openai_webhook(
     """
     Receive and process OpenAI webhooks
     """
-    # Get raw body for signature verification
-    payload = await request.body()
-    webhook_secret = os.environ.get("OPENAI_WEBHOOK_SECRET")
-
-    if not webhook_secret:
-        print("ERROR: OPENAI_WEBHOOK_SECRET environment variable not set")
+    if signing_hmac is None:
+        logger.error("OPENAI_WEBHOOK_SECRET environment variable not set")
         raise HTTPException(status_code=500, detail="Webhook secret not configured")
 
+    # Reject oversized bodies from the Content-Length header before reading
+    # or hashing anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
+    # Check the headers before touching the body
+    signature = parse_openai_signature(webhook_id, webhook_timestamp, webhook_signature)
+    if signature is None:
+        logger.error("OpenAI webhook signature verification failed")
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    # Hash the raw body chunk by chunk as it arrives, keeping the bytes for
+    # parsing once the signature is verified
+    mac = openai_signing_hmac(signing_hmac, webhook_id, webhook_timestamp)
+    payload = await read_and_hash(request, mac)
+
     # Verify webhook signature
-    if not verify_openai_signature(payload, webhook_id, webhook_timestamp, webhook_signature, webhook_secret):
-        print("ERROR: OpenAI webhook signature verification failed")
+    if not signature_matches(signature, mac):
+        logger.error("OpenAI webhook signature verification failed")
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Parse the verified payload
+    # Decode the verified payload straight from bytes into the event struct
     try:
-        event = json.loads(payload.decode('utf-8'))
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Failed to parse webhook payload: {e}")
+        event = msgspec.json.decode(payload, type=OpenAIEvent)
+    except msgspec.DecodeError as e:
+        logger.error("Failed to parse webhook payload: %s", e)
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
     # Handle the event based on type
-    event_type = event.get("type")
-    event_data = event.get("data", {})
-
-    if event_type == "fine_tuning.job.succeeded":
-        print(f"Fine-tuning job succeeded: {event_data.get('id')}")
-        print(f"Fine-tuned model: {event_data.get('fine_tuned_model')}")
-        # TODO: Deploy model, notify team, update database
-
-    elif event_type == "fine_tuning.job.failed":
-        print(f"Fine-tuning job failed: {event_data.get('id')}")
-        error = event_data.get('error', {})
-        print(f"Error: {error.get('message')}")
-        # TODO: Alert team, log error, retry if appropriate
-
-    elif event_type == "fine_tuning.job.cancelled":
-        print(f"Fine-tuning job cancelled: {event_data.get('id')}")
-        # TODO: Clean up resources, update status
-
-    elif event_type == "batch.completed":
-        print(f"Batch completed: {event_data.get('id')}")
-        print(f"Output file: {event_data.get('output_file_id')}")
-        # TODO: Download results, process output, trigger next steps
-
-    elif event_type == "batch.failed":
-        print(f"Batch failed: {event_data.get('id')}")
-        print(f"Error: {event_data.get('errors')}")
-        # TODO: Handle errors, retry failed items
-
-    elif event_type == "batch.cancelled":
-        print(f"Batch cancelled: {event_data.get('id')}")
-        # TODO: Clean up resources, update status
-
-    elif event_type == "batch.expired":
-        print(f"Batch expired: {event_data.get('id')}")
-        # TODO: Clean up resources, handle timeout
-
-    elif event_type == "realtime.call.incoming":
-        print(f"Realtime call incoming: {event_data.get('id')}")
-        # TODO: Handle incoming call, connect client
+    event_type = event.type
 
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler:
+        handler(event.data)
     else:
-        print(f"Unhandled event type: {event_type}")
+        logger.info("Unhandled event type: %s", event_type)
 
     # Return 200 to acknowledge receipt
-    return {"received": True}
+    return RECEIVED_RESPONSE
 
 
 @app.get("/health")
@@ -164,11 +289,21 @@ async def health_check():
     """
     Health check endpoint
     """
-    return {"status": "ok"}
+    return HEALTH_RESPONSE
 
 
 # Run the app
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard] (see requirements.txt).
+    # Multiple workers need the app as an import string.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count()
+    )
\ No newline at end of file
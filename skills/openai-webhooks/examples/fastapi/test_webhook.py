@@ -1,11 +1,9 @@
 import os
 import hmac
-import hashlib
 import base64
 import json
 import time
 import pytest
-from httpx import AsyncClient
 from fastapi.testclient import TestClient
 
 # Set test environment variables before importing app
@@ -16,42 +14,49 @@ os.environ["OPENAI_WEBHOOK_SECRET"] = "whsec_dGVzdF9zZWNyZXRfa2V5X2Zvcl90ZXN0aW5
 from main import app
 
 
+# The secret is fixed for the test run, so decode it once
+SECRET_BYTES = base64.b64decode(
+    os.environ["OPENAI_WEBHOOK_SECRET"].removeprefix('whsec_')
+)
+
+
 def generate_standard_webhooks_signature(
     payload: bytes,
-    secret: str,
     webhook_id: str,
-    webhook_timestamp: str
+    webhook_timestamp: str,
+    secret_bytes: bytes = SECRET_BYTES
 ) -> str:
     """
     Generate a valid Standard Webhooks signature for testing
     """
-    # Remove whsec_ prefix and decode base64
-    secret_key = secret[6:] if secret.startswith('whsec_') else secret
-    secret_bytes = base64.b64decode(secret_key)
-
-    # Create signed content: id.timestamp.payload
-    signed_content = f"{webhook_id}.{webhook_timestamp}.{payload.decode('utf-8')}"
+    # Create signed content: id.timestamp.payload, joined as bytes so the
+    # payload is not decoded and re-encoded
+    signed_content = b'.'.join([webhook_id.encode(), webhook_timestamp.encode(), payload])
 
     # Generate HMAC signature
     signature = base64.b64encode(
-        hmac.new(
-            secret_bytes,
-            signed_content.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
+        hmac.digest(secret_bytes, signed_content, 'sha256')
     ).decode('utf-8')
 
     return f"v1,{signature}"
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
-    return TestClient(app)
+    """One client for the module, so the app lifespan runs only once."""
+    with TestClient(app) as c:
+        yield c
 
 
 @pytest.fixture
-def webhook_secret():
-    return os.environ["OPENAI_WEBHOOK_SECRET"]
+def now_ts():
+    return str(int(time.time()))
+
+
+@pytest.fixture(scope="session")
+def sign():
+    """The Standard Webhooks signer, keyed with the test secret."""
+    return generate_standard_webhooks_signature
 
 
 class TestOpenAIWebhook:
@@ -64,7 +69,7 @@ class TestOpenAIWebhook:
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid signature"
 
-    def test_invalid_signature_format(self, client):
+    def test_invalid_signature_format(self, client, now_ts):
         payload = json.dumps({
             "id": "evt_test_123",
             "type": "fine_tuning.job.succeeded",
@@ -77,14 +82,14 @@ class TestOpenAIWebhook:
             headers={
                 "Content-Type": "application/json",
                 "webhook-id": "msg_test123",
-                "webhook-timestamp": str(int(time.time())),
+                "webhook-timestamp": now_ts,
                 "webhook-signature": "invalid_format"
             }
         )
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid signature"
 
-    def test_expired_timestamp(self, client, webhook_secret):
+    def test_expired_timestamp(self, client, now_ts):
         payload = json.dumps({
             "id": "evt_test_123",
             "type": "fine_tuning.job.succeeded",
@@ -92,10 +97,9 @@ class TestOpenAIWebhook:
         })
 
         webhook_id = "msg_test123"
-        old_timestamp = str(int(time.time()) - 400)  # 400 seconds ago
+        old_timestamp = str(int(now_ts) - 400)  # 400 seconds ago
         signature = generate_standard_webhooks_signature(
             payload.encode('utf-8'),
-            webhook_secret,
             webhook_id,
             old_timestamp
         )
@@ -113,7 +117,48 @@ class TestOpenAIWebhook:
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid signature"
 
-    def test_invalid_signature(self, client):
+    @pytest.mark.parametrize("bad_timestamp", ["not-a-number", "1" * 17])
+    def test_malformed_timestamp(self, client, bad_timestamp):
+        payload = json.dumps({"id": "evt_test_123", "type": "batch.completed", "data": {}})
+        webhook_id = "msg_test123"
+        signature = generate_standard_webhooks_signature(
+            payload.encode('utf-8'),
+            webhook_id,
+            bad_timestamp
+        )
+
+        response = client.post(
+            "/webhooks/openai",
+            content=payload,
+            headers={
+                "Content-Type": "application/json",
+                "webhook-id": webhook_id,
+                "webhook-timestamp": bad_timestamp,
+                "webhook-signature": signature
+            }
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid signature"
+
+    def test_oversized_body(self, client, sign, now_ts, monkeypatch):
+        monkeypatch.setattr("main.MAX_BODY_SIZE", 16)
+        payload = json.dumps({"id": "evt_test_123", "type": "batch.completed", "data": {}}).encode()
+        webhook_id = "msg_test123"
+
+        # A generator body is sent chunked, without a Content-Length header
+        response = client.post(
+            "/webhooks/openai",
+            content=(chunk for chunk in (payload[:10], payload[10:])),
+            headers={
+                "Content-Type": "application/json",
+                "webhook-id": webhook_id,
+                "webhook-timestamp": now_ts,
+                "webhook-signature": sign(payload, webhook_id, now_ts)
+            }
+        )
+        assert response.status_code == 413
+
+    def test_invalid_signature(self, client, now_ts):
         payload = json.dumps({
             "id": "evt_test_123",
             "type": "fine_tuning.job.succeeded",
@@ -126,14 +171,14 @@ class TestOpenAIWebhook:
             headers={
                 "Content-Type": "application/json",
                 "webhook-id": "msg_test123",
-                "webhook-timestamp": str(int(time.time())),
+                "webhook-timestamp": now_ts,
                 "webhook-signature": "v1,invalid_signature_value"
             }
         )
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid signature"
 
-    def test_tampered_payload(self, client, webhook_secret):
+    def test_tampered_payload(self, client, now_ts):
         original_payload = json.dumps({
             "id": "evt_test_123",
             "type": "fine_tuning.job.succeeded",
@@ -141,12 +186,11 @@ class TestOpenAIWebhook:
         })
 
         webhook_id = "msg_test123"
-        webhook_timestamp = str(int(time.time()))
+        webhook_timestamp = now_ts
 
         # Sign with original payload
         signature = generate_standard_webhooks_signature(
             original_payload.encode('utf-8'),
-            webhook_secret,
             webhook_id,
             webhook_timestamp
         )
@@ -171,7 +215,7 @@ class TestOpenAIWebhook:
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid signature"
 
-    def test_valid_signature(self, client, webhook_secret):
+    def test_valid_signature(self, client, now_ts):
         payload = json.dumps({
             "id": "evt_test_valid",
             "type": "fine_tuning.job.succeeded",
@@ -183,10 +227,9 @@ class TestOpenAIWebhook:
         })
 
         webhook_id = "msg_test123"
-        webhook_timestamp = str(int(time.time()))
+        webhook_timestamp = now_ts
         signature = generate_standard_webhooks_signature(
             payload.encode('utf-8'),
-            webhook_secret,
             webhook_id,
             webhook_timestamp
         )
@@ -214,22 +257,17 @@ class TestOpenAIWebhook:
         "batch.expired",
         "realtime.call.incoming"
     ])
-    def test_handle_event_types(self, client, webhook_secret, event_type):
+    def test_handle_event_types(self, client, sign, now_ts, event_type):
         payload = json.dumps({
             "id": f"evt_test_{event_type}",
             "type": event_type,
             "created_at": time.time(),
             "data": {"id": "resource_123"}
-        })
+        }).encode('utf-8')
 
         webhook_id = "msg_test123"
-        webhook_timestamp = str(int(time.time()))
-        signature = generate_standard_webhooks_signature(
-            payload.encode('utf-8'),
-            webhook_secret,
-            webhook_id,
-            webhook_timestamp
-        )
+        webhook_timestamp = now_ts
+        signature = sign(payload, webhook_id, webhook_timestamp)
 
         response = client.post(
             "/webhooks/openai",
@@ -244,7 +282,7 @@ class TestOpenAIWebhook:
         assert response.status_code == 200
         assert response.json() == {"received": True}
 
-    def test_unrecognized_event_type(self, client, webhook_secret):
+    def test_unrecognized_event_type(self, client, now_ts):
         payload = json.dumps({
             "id": "evt_test_unknown",
             "type": "unknown.event.type",
@@ -253,10 +291,9 @@ class TestOpenAIWebhook:
         })
 
         webhook_id = "msg_test123"
-        webhook_timestamp = str(int(time.time()))
+        webhook_timestamp = now_ts
         signature = generate_standard_webhooks_signature(
             payload.encode('utf-8'),
-            webhook_secret,
             webhook_id,
             webhook_timestamp
         )
@@ -274,14 +311,13 @@ class TestOpenAIWebhook:
         assert response.status_code == 200
         assert response.json() == {"received": True}
 
-    def test_malformed_json_payload(self, client, webhook_secret):
+    def test_malformed_json_payload(self, client, now_ts):
         malformed_payload = "{invalid json"
 
         webhook_id = "msg_test123"
-        webhook_timestamp = str(int(time.time()))
+        webhook_timestamp = now_ts
         signature = generate_standard_webhooks_signature(
             malformed_payload.encode('utf-8'),
-            webhook_secret,
             webhook_id,
             webhook_timestamp
         )
@@ -299,23 +335,17 @@ class TestOpenAIWebhook:
         assert response.status_code == 400
         assert response.json()["detail"] == "Invalid JSON payload"
 
-    def test_no_webhook_secret_configured(self, client):
-        # Temporarily remove the webhook secret
-        original_secret = os.environ.get("OPENAI_WEBHOOK_SECRET")
-        del os.environ["OPENAI_WEBHOOK_SECRET"]
-
-        try:
-            response = client.post(
-                "/webhooks/openai",
-                content="{}",
-                headers={"Content-Type": "application/json"}
-            )
-            assert response.status_code == 500
-            assert response.json()["detail"] == "Webhook secret not configured"
-        finally:
-            # Restore the secret
-            if original_secret:
-                os.environ["OPENAI_WEBHOOK_SECRET"] = original_secret
+    def test_no_webhook_secret_configured(self, client, monkeypatch):
+        # Remove the signing key for this test only
+        monkeypatch.setattr("main.signing_hmac", None)
+
+        response = client.post(
+            "/webhooks/openai",
+            content="{}",
+            headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Webhook secret not configured"
 
 
 class TestHealthCheck:
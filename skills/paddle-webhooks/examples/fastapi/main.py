@@ -1,6 +1,10 @@
 import os
+import re
 import hmac
-import hashlib
+import time
+import binascii
+from typing import Optional
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException
 
@@ -10,24 +14,31 @@ app = FastAPI()
 
 webhook_secret = os.environ.get("PADDLE_WEBHOOK_SECRET")
 
-# Initialize Paddle SDK Verifier if available
-# The Python SDK uses a Verifier class for webhook signature verification
-verifier = None
-try:
-    from paddle_billing.Notifications import Secret, Verifier
-    verifier = Verifier()
-except ImportError:
-    pass  # SDK not installed, use manual verification
+# Key the HMAC once at startup. Copying it per request keeps the padded key
+# state, so verification starts straight on the signed payload.
+# Left as None when the secret is not configured, so a request can never be
+# checked against an empty key.
+PADDLE_HMAC = hmac.new(webhook_secret.encode(), digestmod="sha256") if webhook_secret else None
 
+# An HMAC-SHA256 signature is 64 hex characters; anything else can never match
+SIGNATURE_HEX_LENGTH = 64
 
-def verify_paddle_signature(payload: str, signature_header: str, secret: str) -> bool:
+# Reject events whose timestamp is further than this from now (seconds),
+# following Paddle's recommended tolerance
+TIMESTAMP_TOLERANCE = 5
+
+# Matches each "ts=..." / "h1=..." element of the Paddle-Signature header
+SIGNATURE_ELEMENT_RE = re.compile(rb'(?:^|;)(ts|h1)=([^;]+)')
+
+def verify_paddle_signature(payload: bytes, signature_header: Optional[bytes], mac_template) -> bool:
     """
     Verify Paddle webhook signature.
 
     Args:
-        payload: Raw request body as string
-        signature_header: Paddle-Signature header value
-        secret: Webhook secret key
+        payload: Raw request body
+        signature_header: Raw Paddle-Signature header value
+        mac_template: HMAC-SHA256 keyed with the webhook secret; it is
+            copied, never updated, so it can be shared across requests
 
     Returns:
         bool: Whether signature is valid
@@ -37,28 +48,49 @@ def verify_paddle_signature(payload: str, signature_header: str, secret: str) ->
 
     try:
         # Parse the signature header (format: ts=1234567890;h1=abc123...)
-        parts = signature_header.split(";")
+        # in one pass of the compiled regex over the raw bytes
         timestamp = None
         signatures = []
 
-        for part in parts:
-            if part.startswith("ts="):
-                timestamp = part[3:]
-            elif part.startswith("h1="):
-                signatures.append(part[3:])
+        # Slice signature values out of a memoryview so they are decoded
+        # straight from the header buffer without intermediate copies
+        header_view = memoryview(signature_header)
+
+        for match in SIGNATURE_ELEMENT_RE.finditer(signature_header):
+            start, end = match.span(2)
+            if match[1] == b"ts":
+                timestamp = match[2]
+            elif end - start == SIGNATURE_HEX_LENGTH:
+                # Decode each hex signature once, up front. Entries that are
+                # the wrong length or not valid hex can never match, so they
+                # are dropped here.
+                try:
+                    signatures.append(binascii.unhexlify(header_view[start:end]))
+                except ValueError:
+                    continue
 
         if not timestamp or not signatures:
             return False
 
-        # Build the signed payload (timestamp:rawBody)
-        signed_payload = f"{timestamp}:{payload}"
+        # A Unix timestamp in seconds has at most 11 digits. Reject anything
+        # else before spending an HMAC on it.
+        if len(timestamp) > 11 or not timestamp.isdigit():
+            return False
 
-        # Compute the expected signature
-        expected_signature = hmac.new(
-            secret.encode(), signed_payload.encode(), hashlib.sha256
-        ).hexdigest()
+        # Replay protection; this also skips hashing the body for stale events
+        if abs(time.time() - int(timestamp)) > TIMESTAMP_TOLERANCE:
+            return False
 
-        # Check if any signature matches (handles secret rotation)
+        # Compute the expected signature over the signed payload
+        # (timestamp:rawBody) as raw bytes, skipping hex encoding
+        mac = mac_template.copy()
+        mac.update(timestamp)
+        mac.update(b":")
+        mac.update(payload)
+        expected_signature = mac.digest()
+
+        # Check if any signature matches (handles secret rotation), comparing
+        # 32-byte digests rather than 64-character hex strings
         return any(hmac.compare_digest(sig, expected_signature) for sig in signatures)
     except Exception as e:
         print(f"Error verifying signature: {e}")
@@ -69,44 +101,25 @@ def verify_paddle_signature(payload: str, signature_header: str, secret: str) ->
 async def paddle_webhook(request: Request):
     # Get the raw body for signature verification
     payload = await request.body()
-    payload_str = payload.decode()
-    signature_header = request.headers.get("paddle-signature")
+    # Read the header as raw bytes (ASGI lowercases header names)
+    signature_header = next(
+        (value for name, value in request.headers.raw if name == b"paddle-signature"),
+        None
+    )
 
     if not signature_header:
         raise HTTPException(status_code=400, detail="Missing Paddle-Signature header")
 
-    # Option 1: Verify using Paddle SDK (recommended if SDK is available)
-    # The Python SDK uses Verifier().verify(request, Secret(secret)) pattern
-    if verifier and webhook_secret:
-        try:
-            # Import Secret for this verification
-            from paddle_billing.Notifications import Secret
-            # The SDK's verify() method accepts a request-like object and returns bool
-            # Note: For FastAPI, we need to create a compatible request object
-            # Since Verifier expects specific request attributes, we use manual verification
-            # as the more reliable option for FastAPI
-            is_valid = verify_paddle_signature(payload_str, signature_header, webhook_secret)
-            if not is_valid:
-                print("Webhook signature verification failed")
-                raise HTTPException(status_code=400, detail="Invalid signature")
-            print("Webhook verified using manual verification (SDK available but FastAPI requires manual)")
-        except ImportError:
-            # Fallback to manual if import fails
-            if not verify_paddle_signature(payload_str, signature_header, webhook_secret):
-                print("Manual webhook signature verification failed")
-                raise HTTPException(status_code=400, detail="Invalid signature")
-            print("Webhook verified using manual verification")
-    else:
-        # Option 2: Manual verification (when SDK is not available)
-        if not verify_paddle_signature(payload_str, signature_header, webhook_secret):
-            print("Manual webhook signature verification failed")
-            raise HTTPException(status_code=400, detail="Invalid signature")
-        print("Webhook verified using manual verification")
+    # Verify manually: the Paddle Python SDK's Verifier expects Flask/Django
+    # request objects, so it cannot be used with FastAPI
+    if PADDLE_HMAC is None or not verify_paddle_signature(payload, signature_header, PADDLE_HMAC):
+        print("Webhook signature verification failed")
+        raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Parse the event
+    # Parse the event from the body already read for verification
     try:
-        event = await request.json()
-    except Exception as e:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError as e:
         print(f"Failed to parse webhook payload: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
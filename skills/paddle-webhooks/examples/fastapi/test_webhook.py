@@ -16,39 +16,38 @@ client = TestClient(app)
 def generate_paddle_signature(payload: str, secret: str) -> str:
     """Generate a valid Paddle signature for testing."""
     timestamp = int(time.time())
-    signed_payload = f"{timestamp}:{payload}"
-    signature = hmac.new(
-        secret.encode(), signed_payload.encode(), hashlib.sha256
-    ).hexdigest()
+    signed_payload = b"%d:%b" % (timestamp, payload.encode())
+    signature = hmac.digest(secret.encode(), signed_payload, "sha256").hex()
     return f"ts={timestamp};h1={signature}"
 
 
 class TestVerifyPaddleSignature:
     webhook_secret = "test_secret_key"
+    mac = hmac.new(webhook_secret.encode(), digestmod=hashlib.sha256)
 
     def test_valid_signature(self):
         payload = '{"event_type":"test"}'
         signature = generate_paddle_signature(payload, self.webhook_secret)
 
-        assert verify_paddle_signature(payload, signature, self.webhook_secret) is True
+        assert verify_paddle_signature(payload.encode(), signature.encode(), self.mac) is True
 
     def test_invalid_signature(self):
         payload = '{"event_type":"test"}'
         signature = "ts=123;h1=invalid_signature"
 
-        assert verify_paddle_signature(payload, signature, self.webhook_secret) is False
+        assert verify_paddle_signature(payload.encode(), signature.encode(), self.mac) is False
 
     def test_missing_signature_header(self):
         payload = '{"event_type":"test"}'
 
-        assert verify_paddle_signature(payload, None, self.webhook_secret) is False
-        assert verify_paddle_signature(payload, "", self.webhook_secret) is False
+        assert verify_paddle_signature(payload.encode(), None, self.mac) is False
+        assert verify_paddle_signature(payload.encode(), b"", self.mac) is False
 
     def test_malformed_signature_header(self):
         payload = '{"event_type":"test"}'
 
-        assert verify_paddle_signature(payload, "invalid", self.webhook_secret) is False
-        assert verify_paddle_signature(payload, "ts=123", self.webhook_secret) is False
+        assert verify_paddle_signature(payload.encode(), b"invalid", self.mac) is False
+        assert verify_paddle_signature(payload.encode(), b"ts=123", self.mac) is False
 
     def test_tampered_payload(self):
         original_payload = '{"event_type":"test","data":{"id":"123"}}'
@@ -56,24 +55,47 @@ class TestVerifyPaddleSignature:
         signature = generate_paddle_signature(original_payload, self.webhook_secret)
 
         assert (
-            verify_paddle_signature(tampered_payload, signature, self.webhook_secret)
+            verify_paddle_signature(tampered_payload.encode(), signature.encode(), self.mac)
             is False
         )
 
+    def test_non_hex_signature(self):
+        payload = '{"event_type":"test"}'
+        signature = f"ts={int(time.time())};h1=not-a-hex-signature"
+
+        assert verify_paddle_signature(payload.encode(), signature.encode(), self.mac) is False
+
+    def test_non_numeric_timestamp(self):
+        payload = '{"event_type":"test"}'
+        signature = f"ts=abc;h1={'0' * 64}"
+
+        assert verify_paddle_signature(payload.encode(), signature.encode(), self.mac) is False
+
+    def test_expired_timestamp(self):
+        payload = '{"event_type":"test"}'
+        timestamp = int(time.time()) - 60
+        signature = hmac.digest(
+            self.webhook_secret.encode(), b"%d:%b" % (timestamp, payload.encode()), "sha256"
+        ).hex()
+
+        assert verify_paddle_signature(
+            payload.encode(), f"ts={timestamp};h1={signature}".encode(), self.mac
+        ) is False
+
     def test_multiple_h1_signatures(self):
         """Test handling of multiple h1 signatures during rotation."""
         payload = '{"event_type":"test"}'
         timestamp = int(time.time())
-        signed_payload = f"{timestamp}:{payload}"
+        signed_payload = b"%d:%b" % (timestamp, payload.encode())
 
-        valid_signature = hmac.new(
-            self.webhook_secret.encode(), signed_payload.encode(), hashlib.sha256
-        ).hexdigest()
+        valid_signature = hmac.digest(
+            self.webhook_secret.encode(), signed_payload, "sha256"
+        ).hex()
 
         # Include an old invalid signature and a new valid one
         signature = f"ts={timestamp};h1=old_invalid_signature;h1={valid_signature}"
 
-        assert verify_paddle_signature(payload, signature, self.webhook_secret) is True
+        assert verify_paddle_signature(payload.encode(), signature.encode(), self.mac) is True
 
 
 class TestPaddleWebhookEndpoint:
@@ -130,6 +152,19 @@ class TestPaddleWebhookEndpoint:
         assert response.status_code == 200
         assert response.json() == {"received": True}
 
+    def test_unconfigured_secret_returns_400(self, monkeypatch):
+        monkeypatch.setattr("main.PADDLE_HMAC", None)
+        payload = '{"event_type":"subscription.created","data":{"id":"sub_valid"}}'
+        signature = generate_paddle_signature(payload, self.webhook_secret)
+
+        response = client.post(
+            "/webhooks/paddle",
+            content=payload,
+            headers={"Content-Type": "application/json", "Paddle-Signature": signature},
+        )
+
+        assert response.status_code == 400
+
     def test_handles_different_event_types(self):
         event_types = [
             "subscription.created",
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, Query, Request, status
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, Dict, Any, Union, Literal
 from datetime import datetime
 import os
@@ -21,7 +21,21 @@ if not POSTMARK_WEBHOOK_TOKEN:
     raise ValueError("POSTMARK_WEBHOOK_TOKEN environment variable is required")
 
 
+# Both response bodies are constant, so serialize them once at import
+RECEIVED_RESPONSE = Response(content=b'{"received":true}', media_type="application/json")
+HEALTH_RESPONSE = Response(
+    content=b'{"status":"ok","service":"postmark-webhook-handler"}',
+    media_type="application/json"
+)
+
+
 # Pydantic models for webhook events
+class EventHeader(BaseModel):
+    """Just the fields needed to route an event; everything else is ignored."""
+    RecordType: Optional[str] = None
+    MessageID: Optional[str] = None
+
+
 class PostmarkEvent(BaseModel):
     RecordType: str
     MessageID: str
@@ -110,50 +124,40 @@ async def handle_webhook(
             detail="Unauthorized"
         )
 
-    # Parse the raw body
+    # Read the raw body once; Pydantic decodes and validates it directly
+    body = await request.body()
+
+    # Pull out the routing fields
     try:
-        body = await request.json()
-    except Exception as e:
-        logger.error(f"Failed to parse request body: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid JSON payload"
-        )
+        header = EventHeader.model_validate_json(body)
+    except ValidationError as e:
+        if e.errors()[0]["type"] == "json_invalid":
+            logger.error(f"Failed to parse request body: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid JSON payload"
+            )
+        header = None
 
     # Validate required fields
-    if not body.get("RecordType") or not body.get("MessageID"):
-        logger.error(f"Invalid payload structure: {body}")
+    if header is None or not header.RecordType or not header.MessageID:
+        logger.error(f"Invalid payload structure: {body!r}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid payload structure"
         )
 
     # Process the event
-    record_type = body["RecordType"]
-    message_id = body["MessageID"]
+    record_type = header.RecordType
+    message_id = header.MessageID
 
     logger.info(f"Received {record_type} event for message {message_id}")
 
     # Route to appropriate handler
     try:
-        if record_type == "Bounce":
-            event = BounceEvent(**body)
-            await handle_bounce(event)
-        elif record_type == "SpamComplaint":
-            event = SpamComplaintEvent(**body)
-            await handle_spam_complaint(event)
-        elif record_type == "Open":
-            event = OpenEvent(**body)
-            await handle_open(event)
-        elif record_type == "Click":
-            event = ClickEvent(**body)
-            await handle_click(event)
-        elif record_type == "Delivery":
-            event = DeliveryEvent(**body)
-            await handle_delivery(event)
-        elif record_type == "SubscriptionChange":
-            event = SubscriptionChangeEvent(**body)
-            await handle_subscription_change(event)
+        if entry := EVENT_HANDLERS.get(record_type):
+            model, handler = entry
+            await handler(model.model_validate_json(body))
         else:
             logger.warning(f"Unknown event type: {record_type}")
             # Still return 200 for unknown events
@@ -161,7 +165,7 @@ async def handle_webhook(
         logger.error(f"Error processing {record_type} event: {e}")
         # Still return 200 to prevent retries
 
-    return {"received": True}
+    return RECEIVED_RESPONSE
 
 
 # Event handlers
@@ -243,10 +247,21 @@ async def handle_subscription_change(event: SubscriptionChangeEvent):
     # - Trigger preference center update
 
 
+# Map record types to their event model and handler
+EVENT_HANDLERS = {
+    "Bounce": (BounceEvent, handle_bounce),
+    "SpamComplaint": (SpamComplaintEvent, handle_spam_complaint),
+    "Open": (OpenEvent, handle_open),
+    "Click": (ClickEvent, handle_click),
+    "Delivery": (DeliveryEvent, handle_delivery),
+    "SubscriptionChange": (SubscriptionChangeEvent, handle_subscription_change),
+}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "service": "postmark-webhook-handler"}
+    return HEALTH_RESPONSE
 
 
 if __name__ == "__main__":
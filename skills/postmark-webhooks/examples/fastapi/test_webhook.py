@@ -78,6 +78,14 @@ class TestPostmarkWebhook:
         )
         assert response.status_code == 400
 
+        # Not a JSON object
+        response = client.post(
+            f"{WEBHOOK_URL}?token={VALID_TOKEN}",
+            json=["Bounce"]
+        )
+        assert response.status_code == 400
+        assert "Invalid payload structure" in response.json()["detail"]
+
     def test_bounce_event(self):
         """Test handling of bounce events."""
         bounce_event = {
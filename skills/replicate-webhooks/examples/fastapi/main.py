@@ -11,6 +11,7 @@ from datetime import datetime
 from fastapi import FastAPI, Request, Response, Header, HTTPException
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+import orjson
 
 # Load environment variables
 load_dotenv()
@@ -66,10 +67,17 @@ def verify_replicate_signature(
         raise
 
 
+# The health body never changes, so serialize it once at import
+HEALTH_RESPONSE = Response(
+    content=b'{"status":"Replicate webhook handler running"}',
+    media_type="application/json"
+)
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
-    return {"status": "Replicate webhook handler running"}
+    return HEALTH_RESPONSE
 
 
 @app.post("/webhooks/replicate")
@@ -184,12 +192,13 @@ async def handle_replicate_webhook(
     # - Process and store the output
 
     processing_time = (time.time() - start_time) * 1000  # ms
-    return JSONResponse(
-        content={
+    return Response(
+        content=orjson.dumps({
             "received": True,
             "predictionStatus": status,
             "processingTime": f"{processing_time:.2f}ms"
-        }
+        }),
+        media_type="application/json"
     )
 
 